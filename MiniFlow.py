@@ -89,127 +89,22 @@
 
 
 import numpy as np
-import matplotlib.pyplot as plot
-get_ipython().magic('matplotlib inline')
-DEBUG = True
+
+# The engine lives in the `miniflow` package next to this file; importing it
+# only needs NumPy. The cells below walk through how each piece works.
+from miniflow import *
 
 
 # In[2]:
 
 
-class Node(object):
-    """
-    Base class for nodes in the network.
-    Should have following properties:
-    1. Should hold its value
-    2. Should know what are incoming nodes
-    3. Should know to which node(s) it outputs the value
-    4. Should hold the gradient calculated
-
-    Arguments:
-
-        `inbound_nodes`: A list of nodes with edges into this node.
-    """
-    def __init__(self, inbound_nodes=[]):
-        """
-        Node's constructor (runs when the object is instantiated). Sets
-        properties that all nodes need.
-        """
-        self.name = "Node"
-        
-        # The eventual value of this node. Set by running
-        # the forward() method.
-        self.value = None
-        
-        # A list of nodes with edges into this node.
-        # Just like input arguments to any function/method
-        self.inbound_nodes = inbound_nodes
-
-        # A list of nodes that this node outputs to.
-        # Is it possible to know which node I am gonna send the result? Definelty NO!!!
-        self.outbound_nodes = []
-        
-        # Keys are the inputs to this node and
-        # their values are the partials of this node with
-        # respect to that input.
-        self.gradients = {}
-        
-        # Sets this node as an outbound node for all of
-        # this node's inputs.
-        # Hey there I am your output node, do send me your results, ok!
-        for node in inbound_nodes:
-            node.outbound_nodes.append(self)
-
-    def forward(self):
-        """
-        Every node that uses this class as a base class will
-        need to define its own `forward` method.
-        """
-        raise NotImplementedError
-
-    def backward(self):
-        """
-        Every node that uses this class as a base class will
-        need to define its own `backward` method.
-        """
-        raise NotImplementedError
+# `Node` is defined in miniflow/nodes.py
 
 
 # In[3]:
 
 
-class Input(Node):
-    """
-    A generic input into the network.
-    """
-    def __init__(self, name='Input'):
-        # The base class constructor has to run to set all
-        # the properties here.
-        #
-        # The most important property on an Input is value.
-        # self.value is set during `topological_sort` later.
-        Node.__init__(self)
-        self.name = name
-
-    # NOTE: Input node is the only node where the value
-    # may be passed as an argument to forward().
-    #
-    # All other node implementations should get the value
-    # of the previous node from self.inbound_nodes
-    #
-    # Example:
-    # val0 = self.inbound_nodes[0].value
-    def forward(self, value=None):
-        # Overwrite the value if one is passed in.
-        if(DEBUG) : print("\n----->Forward pass @ " ,self.name)
-        if value is not None:
-            self.value = value
-            if(DEBUG) : print("w.r.t {} node of value: {} ".format(self.name, self.value))
-            
-
-    def backward(self):
-        # An Input node has no inputs so the gradient (derivative)
-        # is zero.
-        # The key, `self`, is reference to this object.
-        self.gradients = {self: 0}
-        # Weights and bias may be inputs, so you need to sum
-        # the gradient from output gradients.
-        if(DEBUG) : print('\n')
-        if(DEBUG) : print('=============================\n\tBP @ {}\n=============================\n'.format(self.name))
-        if(DEBUG) : print('Initial Gradients:\n------------------')
-        if(DEBUG) : print('W.r.t {}: \n------------\n{}'.format(self.name,self.gradients[self]))
-            
-        for n in self.outbound_nodes:
-            grad_cost = n.gradients[self]
-            
-            if(DEBUG) : print('\n')
-            if(DEBUG) : print('Getting ', n.name, 'gradient : \n<-----------------------------\n', grad_cost)
-            if(DEBUG) : print('\n')
-                
-            self.gradients[self] += grad_cost * 1
-            
-        if(DEBUG) : print('Calculated Final Gradient:(Note: Calculated by next node in the graph!!!)\n----------------')
-        if(DEBUG) : print('W.r.t ', self.name, ' : \n-------------\n', self.gradients[self])  
+# `Input` is defined in miniflow/nodes.py
 
 
 # ## DAG
@@ -224,97 +119,28 @@ class Input(Node):
 # In[4]:
 
 
-T_DEBUG = True
-def topological_sort(feed_dict):
-    """
-    Sort the nodes in topological order using Kahn's Algorithm.
-
-    `feed_dict`: A dictionary where the key is a `Input` Node and the value is 
-    the respective value feed to that Node.
+# `topological_sort` and `sort_nodes` are defined in miniflow/graph.py
 
-    Returns a list of sorted nodes.
-    """
-    if T_DEBUG: print('-----> topological_sort')
-    input_nodes = [n for n in feed_dict.keys()]
 
-    G = {}
-    nodes = [n for n in input_nodes]
-    
-    if T_DEBUG: print('Input Nodes:'); [print(n.name) for n in input_nodes]
-        
-    while len(nodes) > 0:
-        n = nodes.pop(0)
-        
-        if T_DEBUG: print('Pop: ', n.name)
-            
-        if n not in G:
-            if T_DEBUG: print('Adding: ', n.name, 'to the Graph')
-            G[n] = {'in': set(), 'out': set()}
-            
-        for m in n.outbound_nodes:
-            if m not in G: 
-                if T_DEBUG: print('Adding: ', m.name, 'to the Graph')
-                G[m] = {'in': set(), 'out': set()}
-                
-            G[n]['out'].add(m); 
-            if T_DEBUG: print('Adding', n.name, '----->', m.name)
-                
-            G[m]['in'].add(n); 
-            if T_DEBUG: print('Adding', m.name, '<-----', n.name)
-                
-            nodes.append(m)
-            if T_DEBUG: print('Appending ', m.name)
-          
-    L = []
-    S = set(input_nodes)
-    if T_DEBUG: print('Input Nodes:'); [print(n.name) for n in S]
-    while len(S) > 0:
-        n = S.pop()
-        if T_DEBUG: print('Pop: ', n.name)
-
-        #Assign values to the input node
-        if isinstance(n, Input):
-            if T_DEBUG: print('Feeding value: ', feed_dict[n], ' =====>  ', n.name)
-            n.value = feed_dict[n]
-
-        L.append(n)
-        if T_DEBUG: print('Adding ', n.name, 'to the sorted List')
-        for m in n.outbound_nodes:
-            G[n]['out'].remove(m)
-            G[m]['in'].remove(n)
-            if T_DEBUG: print('Removing', n.name, '----->', m.name)
-            if T_DEBUG: print('Removing', m.name, '<-----', n.name)
-            # if no other incoming edges add to S
-            if len(G[m]['in']) == 0:
-                if T_DEBUG: print('\nNo input nodes!!! Adding: ', m.name, 'to the Graph\n')
-                S.add(m)
-    
-    if T_DEBUG: print('Sorted Nodes:\n'); [print(n.name) for n in L]
-    
-    if T_DEBUG: print('<------------------------------------ topological_sort')
-        
-    return L
+# ## Tracing
+# Instead of sprinkling `print` calls through every operation, the loops that run the graph report
+# what they do to a *tracer*. A tracer receives an event before and after each node's `forward` and
+# `backward`, carrying the node, the shapes and dtypes of the values involved and the time it took.
+# When no tracer is attached the loops run the nodes directly, so there is nothing to pay for it.
 
-
-# In[5]:
+# In[ ]:
 
 
-def forward_pass(output_node, sorted_nodes):
-    """
-    Performs a forward pass through a list of sorted nodes.
+# `Tracer`, `TraceRecorder`, `PrintTracer` and `set_tracer` are defined in miniflow/tracers.py
 
-    Arguments:
+# Follow the examples below node by node.
+set_tracer(PrintTracer())
 
-        `output_node`: A node in the graph, should be the output node (have no outgoing edges).
-        `sorted_nodes`: A topologically sorted list of nodes.
 
-    Returns the output Node's value
-    """
+# In[5]:
 
-    for n in sorted_nodes:
-        n.forward()
 
-    return output_node.value
+# `forward_pass` is defined in miniflow/graph.py
 
 
 # # Lets define our Operations
@@ -322,27 +148,7 @@ def forward_pass(output_node, sorted_nodes):
 # In[6]:
 
 
-class Add(Node):
-    def __init__(self, *inputs):
-        Node.__init__(self, inputs)
-        self.name = "Add_Op"
-
-    def forward(self):
-        """
-        For reference, here's the old way from the last
-        quiz. You'll want to write code here.
-        """
-        self.value = 0
-        for i in range(len(self.inbound_nodes)):
-            
-            if(DEBUG) : print("Initial value of {} is {}".format(self.name, self.value))
-                
-            self.value +=  self.inbound_nodes[i].value
-            
-            if(DEBUG) : print("{}:{} ---> {}:{}".format(self.inbound_nodes[i].name, self.inbound_nodes[i].value, 
-                                           self.name, self.value))
-            
-
+# `Add` is defined in miniflow/nodes.py
 
 
 # In[7]:
@@ -358,37 +164,10 @@ addition_res = forward_pass(f, graph)
 print("{} + {} + {} = {} (according to miniflow)".format(feed_dict[x], feed_dict[y], feed_dict[z], addition_res))
 
 
-# In[8]:
-
-
-T_DEBUG = False
-
-
 # In[9]:
 
 
-class Mul(Node):
-    def __init__(self, *inputs):
-        Node.__init__(self, inputs)
-        self.name = "Mul_Op"
-
-    def forward(self):
-        """
-        For reference, here's the old way from the last
-        quiz. You'll want to write code here.
-        """
-        self.value = 1
-        for i in range(len(self.inbound_nodes)):
-            if(DEBUG) : print("Initial value of {} is {}".format(self.name, self.value))
-                
-            self.value *=  self.inbound_nodes[i].value
-            
-            if(DEBUG) : print("{}:{} ---> {}:{}".format(self.inbound_nodes[i].name, self.inbound_nodes[i].value, 
-                                           self.name, self.value))
-            
-        # x_value = self.inbound_nodes[0].value
-        # y_value = self.inbound_nodes[1].value
-        # self.value = x_value + y_value
+# `Mul` is defined in miniflow/nodes.py
 
 
 # In[10]:
@@ -434,72 +213,7 @@ np.dot(a,b)
 # In[11]:
 
 
-class Linear(Node):
-    """
-    Represents a node that performs a linear transform.
-    """
-    def __init__(self, X, W, b):
-        # The base class (Node) constructor. Weights and bias
-        # are treated like inbound nodes.
-        Node.__init__(self, [X, W, b])
-        self.name = "Linear_OP"
-
-    def forward(self):
-        """
-        Performs the math behind a linear transform.
-        """
-        self.X = self.inbound_nodes[0]
-        self.W = self.inbound_nodes[1]
-        self.b = self.inbound_nodes[2]
-
-        self.value = np.dot(self.X.value,self.W.value) + self.b.value
-        
-
-        
-        if(DEBUG) :  print("\n----->Forward pass @ " ,self.name)
-        if(DEBUG) : print("{}:\n{} * \n{}:\n{} + \n{}:\n{} =\n {}:\n{}".format(self.X.name,self.X.value,
-                                                                  self.W.name, self.W.value,
-                                                                  self.b.name, self.b.value,
-                                                                  self.name, self.value))
-
-    def backward(self):
-        """
-        Calculates the gradient based on the output values.
-        """
-        # Initialize a partial for each of the inbound_nodes.
-        self.gradients = {n: np.zeros_like(n.value) for n in self.inbound_nodes}
-        # Cycle through the outputs. The gradient will change depending
-        # on each output, so the gradients are summed over all outputs.
-        
-        if(DEBUG) : print('\n')
-        if(DEBUG) : print('=============================\n\tBP @ Linear\n=============================\n')
-        if(DEBUG) : print('Initial Gradients:\n------------------')
-        if(DEBUG) : print('W.r.t {}: \n---------------\n{}'.format(self.X.name, self.gradients[self.X]))
-        if(DEBUG) : print('W.r.t {}: \n---------------\n{}'.format(self.W.name, self.gradients[self.W]))
-        if(DEBUG) : print('W.r.t {}: \n---------------\n{}'.format(self.b.name, self.gradients[self.b]))
-            
-        for n in self.outbound_nodes:
-            # Get the partial of the cost with respect to this node.
-            # The out is mostly only one node, a activation function!(sigmoid here)
-            grad_cost = n.gradients[self]
-            
-            if(DEBUG) : print('\n')
-            if(DEBUG) : print('Getting ', n.name, 'gradient is : \n<-----------------------------\n', grad_cost)
-            if(DEBUG) : print('\n')
-                
-            # Get the gradient for this node from next node and respective operation 
-            # (mutliply/add) with each input of this node to set their respective gradients
-            # Set the partial of the loss with respect to this node's inputs.
-            self.gradients[self.X] += np.dot(grad_cost, self.W.value.T)
-            # Set the partial of the loss with respect to this node's weights.
-            self.gradients[self.W] += np.dot(self.X.value.T, grad_cost)
-            # Set the partial of the loss with respect to this node's bias.
-            self.gradients[self.b] += np.sum(grad_cost, axis=0, keepdims=False)
-            
-        if(DEBUG) : print('Calculated Final Gradient:\n----------------')
-        if(DEBUG) : print('W.r.t ',self.X.name,': \n-------------\n', self.gradients[self.inbound_nodes[0]])
-        if(DEBUG) : print('W.r.t ',self.W.name,': \n-------------\n', self.gradients[self.inbound_nodes[1]])
-        if(DEBUG) : print('W.r.t ',self.b.name,': \n-------------\n', self.gradients[self.inbound_nodes[2]])
+# `Linear` is defined in miniflow/nodes.py
 
 
 # ![](w2-backprop-graph.png)
@@ -538,66 +252,7 @@ print("\n\noutput: \n", output)
 # In[13]:
 
 
-class Sigmoid(Node):
-    """
-    Represents a node that performs the sigmoid activation function.
-    """
-    def __init__(self, node):
-        # The base class constructor.
-        Node.__init__(self, [node])
-        self.name = "Sigmoid_Op"
-
-    def _sigmoid(self, x):
-        """
-        This method is separate from `forward` because it
-        will be used with `backward` as well.
-
-        `x`: A numpy array-like object.
-        """
-        return 1. / (1. + np.exp(-x))
-
-    def forward(self):
-        """
-        Perform the sigmoid function and set the value.
-        """
-        if(DEBUG) : print("\n----->Forward pass @ " ,self.name)
-        if(DEBUG) : print("Initial value of {} is {}".format(self.name, self.value))
-        input_value = self.inbound_nodes[0].value
-        self.value = self._sigmoid(input_value)
-        if(DEBUG) : print("{}:\n{} ---> {}:\n{}".format(self.inbound_nodes[0].name, self.inbound_nodes[0].value, 
-                                           self.name, self.value))
-
-    def backward(self):
-        """
-        Calculates the gradient using the derivative of
-        the sigmoid function.
-        """
-        # Initialize the gradients to 0.
-        self.gradients = {n: np.zeros_like(n.value) for n in self.inbound_nodes}
-
-        if(DEBUG) : print('\n')
-        if(DEBUG) : print('=============================\n\tBP @ Sigmoid\n=============================\n')
-        if(DEBUG) : print('Initial Gradients:\n------------------')
-        if(DEBUG) : print('W.r.t ', self.inbound_nodes[0].name, ': \n----------------\n', self.gradients[self.inbound_nodes[0]])
-        
-        # Cycle through the outputs. The gradient will change depending
-        # on each output, so the gradients are summed over all outputs.
-        for n in self.outbound_nodes:
-            # Get the partial of the cost with respect to this node.
-            grad_cost = n.gradients[self] #For eg. get it from MSE
-            
-            if(DEBUG) : print('\n')
-            if(DEBUG) : print('Getting ', n.name, 'gradient : \n<-----------------------------\n', grad_cost)
-            if(DEBUG) : print('\n')
-                
-            sigmoid = self.value
-            self.gradients[self.inbound_nodes[0]] += sigmoid * (1 - sigmoid) * grad_cost
-            
-        if(DEBUG) : print('Calculated Final Gradient:')
-        if(DEBUG) : print('--------------------------')
-        if(DEBUG) : print('W.r.t ',self.inbound_nodes[0].name,': \n-------------\n', self.gradients[self.inbound_nodes[0]])    
-
-
+# `Sigmoid` is defined in miniflow/nodes.py
 
 
 # In[14]:
@@ -625,10 +280,16 @@ Output should be:
 print("\n\noutput: \n", output)
 
 
-# In[ ]:
+# `Linear` followed by `Sigmoid` is so common that miniflow also has it as one node, `Dense`.
+# It gives the same output but works in place on the result of the matrix multiplication,
+# so it needs about half the memory per layer.
 
+# In[ ]:
 
 
+dense = Dense(X, W, b)
+graph = topological_sort(feed_dict)
+print("\n\nDense output: \n", forward_pass(dense, graph))
 
 
 # ### MSE (Cost/Loss)
@@ -647,62 +308,7 @@ print("\n\noutput: \n", output)
 # In[15]:
 
 
-class MSE(Node):
-    def __init__(self, y, a):
-        """
-        The mean squared error cost function.
-        Should be used as the last node for a network.
-        """
-        # Call the base class' constructor.
-        Node.__init__(self, [y, a])
-        self.name = "MSE_Op"
-        
-
-    def forward(self):
-        """
-        Calculates the mean squared error.
-        """
-        # NOTE: We reshape these to avoid possible matrix/vector broadcast
-        # errors.
-        #
-        # For example, if we subtract an array of shape (3,) from an array of shape
-        # (3,1) we get an array of shape(3,3) as the result when we want
-        # an array of shape (3,1) instead.
-        #
-        # Making both arrays (3,1) insures the result is (3,1) and does
-        # an elementwise subtraction as expected.
-        if(DEBUG) : print("\n----->Forward pass @ " ,self.name)
-        if(DEBUG) : print("Initial value of {} is {}".format(self.name, self.value))
-            
-        y = self.inbound_nodes[0].value.reshape(-1, 1)
-        a = self.inbound_nodes[1].value.reshape(-1, 1)
-
-        self.m = self.inbound_nodes[0].value.shape[0]
-        # Save the computed output for backward.
-        self.diff = y - a
-        self.value = np.mean(np.square(self.diff))
-        
-        if(DEBUG) : print("{}:\n{} - \n{}:\n{} =\n {}:\n{}".format(self.inbound_nodes[0].name,y,
-                                                                  self.inbound_nodes[1].name, a,
-                                                                  self.name, self.value))
-    def backward(self):
-        """
-        Calculates the gradient of the cost.
-
-        This is the final node of the network so outbound nodes
-        are not a concern.
-        """
-        if(DEBUG) : print('\n')
-        if(DEBUG) : print('=============================\n\tBP @ MSE\n=============================\n')
-        if(DEBUG) : print('Initial Gradients:\n------------------')
-        if(DEBUG) : print('Nothing! Since this node will be the last node!!!\n')
-        
-        self.gradients[self.inbound_nodes[0]] = (2 / self.m) * self.diff
-        self.gradients[self.inbound_nodes[1]] = (-2 / self.m) * self.diff #for eg. this goes back to Sigmoid
-        
-        if(DEBUG) : print('Calculated Final Gradient:\n----------------')
-        if(DEBUG) : print('W.r.t ',self.inbound_nodes[0].name,': \n------------------\n', self.gradients[self.inbound_nodes[0]])
-        if(DEBUG) : print('W.r.t ',self.inbound_nodes[1].name,': \n------------------\n', self.gradients[self.inbound_nodes[1]])
+# `MSE` is defined in miniflow/nodes.py
 
 
 # In[16]:
@@ -824,22 +430,18 @@ print(cost.value)
 # In[17]:
 
 
-def forward_and_backward(graph):
-    """
-    Performs a forward pass and a backward pass through a list of sorted Nodes.
+# `forward_and_backward` is defined in miniflow/graph.py
+
+
+# ### Compiling the graph once
+# `topological_sort` walks the whole graph every time it is called. When the same network is evaluated
+# again and again with new data (training steps, serving requests) the order never changes, so we sort once,
+# keep the forward and reverse orders around and only swap the values of the `Input` nodes.
 
-    Arguments:
+# In[ ]:
 
-        `graph`: The result of calling `topological_sort`.
-    """
-    # Forward pass
-    for n in graph:
-        n.forward()
 
-    # Backward pass
-    # see: https://docs.python.org/2.3/whatsnew/section-slices.html
-    for n in graph[::-1]:
-        n.backward()
+# `Graph` is defined in miniflow/graph.py
 
 
 # Let's consider a network with a linear node $l_1$, a sigmoid node $s$, and another linear node $l_2$, followed by an MSE node to calculate the cost, $C$.
@@ -929,8 +531,7 @@ def forward_and_backward(graph):
 # In[18]:
 
 
-T_DEBUG = False
-DEBUG = True
+set_tracer(PrintTracer())
 
 
 # In[19]:
@@ -1057,31 +658,13 @@ print("The local minimum occurs at %f" % cur_x)
 # In[23]:
 
 
-def sgd_update(trainables, learning_rate=1e-2):
-    """
-    Updates the value of each trainable with SGD.
-
-    Arguments:
-
-        `trainables`: A list of `Input` Nodes representing weights/biases.
-        `learning_rate`: The learning rate.
-    """
-    # Performs SGD
-    #
-    # Loop over the trainables
-    for t in trainables:
-        # Change the trainable's value by subtracting the learning rate
-        # multiplied by the partial of the cost with respect to this
-        # trainable.
-        partial = t.gradients[t]
-        t.value -= learning_rate * partial
+# `sgd_update` is defined in miniflow/optimizers.py
 
 
 # In[24]:
 
 
-T_DEBUG = False
-DEBUG = False
+set_tracer(None)
 
 
 # In[25]:
@@ -1094,18 +677,11 @@ Be warned that if you increase them too much,
 logs will overshoot :)
 """
 
-import numpy as np
-from sklearn.datasets import load_boston
-from sklearn.utils import shuffle, resample
-# from miniflow import *
-
-# Load data
-data = load_boston()
-X_ = data['data']
-y_ = data['target']
+from miniflow.data import DataLoader
+from miniflow.datasets import load_boston
 
-# Normalize data
-X_ = (X_ - np.mean(X_, axis=0)) / np.std(X_, axis=0)
+# Load and normalize data
+X_, y_ = load_boston()
 
 n_features = X_.shape[1] # 13
 n_hidden = 10
@@ -1137,9 +713,14 @@ epochs = 100
 # Total number of examples
 m = X_.shape[0] # 506
 batch_size = 11
-steps_per_epoch = m // batch_size
 
-graph = topological_sort(feed_dict)
+# Shuffles the examples once per epoch and prepares the next batch in the
+# background while the current one is trained on.
+loader = DataLoader(X_, y_, batch_size=batch_size, drop_last=True)
+steps_per_epoch = len(loader)
+
+# Train in float32 (half the memory, faster matmuls) and sum the loss in float64.
+graph = Graph(feed_dict, dtype_policy=DTypePolicy(np.float32, loss=np.float64))
 trainables = [W1, b1, W2, b2]
 
 print("Total number of examples = {}".format(m))
@@ -1149,22 +730,19 @@ total_loss = []
 # Step 4
 for i in range(epochs):
     loss = 0
-    for j in range(steps_per_epoch):
-        # Step 1
-        # Randomly sample a batch of examples
-        X_batch, y_batch = resample(X_, y_, n_samples=batch_size)
-
+    # Step 1
+    # Go through every example once, a shuffled batch at a time
+    for X_batch, y_batch in loader:
         # Reset value of X and y Inputs
-        X.value = X_batch
-        y.value = y_batch
+        graph.feed({X: X_batch, y: y_batch})
 
         # Step 2
-        forward_and_backward(graph)
+        graph.forward_and_backward()
 
         # Step 3
         sgd_update(trainables)
 
-        loss += graph[-1].value
+        loss += cost.value
         
 
 #     print("=======> Epoch: {}, Loss: {:.3f}".format(i+1, loss/steps_per_epoch))
@@ -1174,7 +752,9 @@ for i in range(epochs):
 # In[26]:
 
 
-plot.plot(range(len(total_loss)), total_loss)
+from miniflow.plotting import plot_loss
+
+plot_loss(total_loss)
 
 
 # In[ ]:
@@ -0,0 +1,268 @@
+"""
+Benchmarks for miniflow: per-op forward/backward throughput, sorting
+synthetic graphs, and end-to-end training steps of small MLPs.
+
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmarks/bench.py --output baseline.json
+    python benchmarks/bench.py --compare baseline.json
+
+Every result has `seconds` (per call) and `per_second`: FLOPs for `Linear`,
+elements for the other ops, nodes for sorting and steps for the MLPs.
+With `--compare` the exit status is 1 if any benchmark got slower than the
+baseline by more than `--tolerance`. Timings are the best of several
+repeats, and all data comes from a fixed seed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miniflow import (Node, Input, Add, Mul, Linear, Sigmoid, MSE, Graph, SGD,  # noqa: E402
+                      topological_sort, sort_nodes)
+
+
+def best_time(fn, repeat=5, min_time=0.05):
+    """
+    Returns the best time of one call of `fn` in seconds, over `repeat`
+    rounds of as many calls as fit in `min_time`.
+    """
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+class Sink(Node):
+    """
+    Stands in for the rest of the graph: feeds a fixed gradient back into `node`.
+    """
+    def __init__(self, node, gradient):
+        Node.__init__(self, [node])
+        self.gradients[node] = gradient
+
+    def forward(self):
+        pass
+
+
+def has_backward(node):
+    return type(node).backward is not Node.backward
+
+
+def op_benchmarks(shapes, dtypes, repeat):
+    random_state = np.random.RandomState(0)
+    results = {}
+    for dtype in dtypes:
+        for rows, cols in shapes:
+            def array(*shape):
+                return random_state.randn(*shape).astype(dtype)
+
+            X, W, b = Input('X'), Input('W'), Input('b')
+            y, a = Input('y'), Input('a')
+            feed = {X: array(rows, cols), W: array(cols, cols), b: array(cols),
+                    y: array(rows, 1), a: array(rows, 1)}
+            ops = {
+                'Linear': (Linear(X, W, b), 2. * rows * cols * cols),
+                'Sigmoid': (Sigmoid(X), rows * cols),
+                'MSE': (MSE(y, a), rows),
+                'Add': (Add(X, X, X), rows * cols * 2),
+                'Mul': (Mul(X, X, X), rows * cols * 2),
+            }
+            Graph(feed)
+            for name, (op, work) in ops.items():
+                op.forward()
+                if op is not ops['MSE'][0]:
+                    Sink(op, np.ones_like(op.value))
+                label = 'op/{}/{{}}/{}/{}x{}'.format(name, np.dtype(dtype).name, rows, cols)
+                seconds = best_time(op.forward, repeat)
+                results[label.format('forward')] = {'seconds': seconds, 'per_second': work / seconds}
+                if has_backward(op):
+                    seconds = best_time(op.backward, repeat)
+                    results[label.format('backward')] = {'seconds': seconds, 'per_second': work / seconds}
+    return results
+
+
+def synthetic_graph(size, fan_in=3, seed=0):
+    """
+    Builds a random DAG of `size` nodes: a few inputs, then `Add` nodes
+    over up to `fan_in` earlier nodes. Returns a feed_dict for the inputs.
+    """
+    random_state = np.random.RandomState(seed)
+    inputs = [Input('x{}'.format(i)) for i in range(max(1, size // 100))]
+    built = list(inputs)
+    while len(built) < size:
+        count = random_state.randint(1, fan_in + 1)
+        picks = random_state.randint(0, len(built), count)
+        built.append(Add(*[built[i] for i in picks]))
+    return {n: 1. for n in inputs}
+
+
+def shortcut_graph(size):
+    """
+    Builds a chain of `size // 2` `Sigmoid` nodes from one input and, from
+    the last link back to the first, an `Add` of the input and each link,
+    with a constant scale on the last one. Sorting discovers the `Add`
+    nodes from the input before the chain reaches the links they use, which
+    makes any walk back along the inbound edges that isn't shared between
+    nodes quadratic. Returns a feed_dict for the input.
+    """
+    x = Input('x')
+    scale = Input('scale', constant=True)
+    scale.value = 2.
+    chain = [x]
+    for _ in range(size // 2):
+        chain.append(Sigmoid(chain[-1]))
+    for link in chain[:0:-1]:
+        Add(x, link)
+    Mul(Add(x, chain[-1]), Mul(scale, scale))
+    return {x: 1.}
+
+
+def sort_benchmarks(sizes, repeat):
+    results = {}
+    for size in sizes:
+        feed_dict = synthetic_graph(size)
+        seconds = best_time(lambda: topological_sort(feed_dict), repeat)
+        results['sort/topological_sort/{}'.format(size)] = {'seconds': seconds, 'per_second': size / seconds}
+        seconds = best_time(lambda: sort_nodes(feed_dict), repeat)
+        results['sort/sort_nodes/{}'.format(size)] = {'seconds': seconds, 'per_second': size / seconds}
+        feed_dict = shortcut_graph(size)
+        seconds = best_time(lambda: sort_nodes(feed_dict), repeat)
+        results['sort/sort_nodes/shortcuts/{}'.format(size)] = {'seconds': seconds,
+                                                                'per_second': size / seconds}
+    return results
+
+
+def mlp_benchmarks(configs, dtypes, repeat):
+    results = {}
+    for dtype in dtypes:
+        for batch_size, features, hidden in configs:
+            random_state = np.random.RandomState(0)
+            X, y = Input('X'), Input('y')
+            feed = {X: random_state.randn(batch_size, features).astype(dtype),
+                    y: random_state.randn(batch_size).astype(dtype)}
+            h, size, trainables = X, features, []
+            for width in list(hidden) + [1]:
+                W, b = Input('W'), Input('b')
+                feed[W] = (random_state.randn(size, width) / np.sqrt(size)).astype(dtype)
+                feed[b] = np.zeros(width, dtype)
+                trainables += [W, b]
+                h = Linear(h, W, b)
+                if width != 1:
+                    h = Sigmoid(h)
+                size = width
+            MSE(y, h)
+
+            graph = Graph(feed)
+            optimizer = SGD(1e-3)
+
+            def step():
+                graph.forward_and_backward()
+                optimizer(trainables)
+
+            seconds = best_time(step, repeat)
+            label = 'mlp/{}/batch{}/{}'.format(np.dtype(dtype).name, batch_size,
+                                               'x'.join(str(w) for w in [features] + list(hidden)))
+            results[label] = {'seconds': seconds, 'per_second': 1. / seconds}
+    return results
+
+
+def run(quick=False, only=None, repeat=5):
+    if quick:
+        shapes, sizes = [(32, 32), (256, 64)], [100, 1000]
+        configs = [(32, 13, [10])]
+    else:
+        shapes, sizes = [(32, 32), (256, 64), (256, 256), (1024, 512)], [100, 1000, 10000]
+        configs = [(32, 13, [10]), (128, 64, [128, 128]), (512, 256, [512, 256, 128])]
+    dtypes = [np.float32, np.float64]
+
+    suites = {
+        'op': lambda: op_benchmarks(shapes, dtypes, repeat),
+        'sort': lambda: sort_benchmarks(sizes, repeat),
+        'mlp': lambda: mlp_benchmarks(configs, dtypes, repeat),
+    }
+    results = {}
+    for name, suite in suites.items():
+        if only is None or name in only:
+            results.update(suite())
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Prints the change of every benchmark found in both runs and returns
+    the names of those slower than the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  <-- slower'
+        print('{:<50} {:>12.3e}s {:>8.2f}x{}'.format(name, result['seconds'], ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="small shapes only")
+    parser.add_argument('--only', nargs='+', choices=['op', 'sort', 'mlp'], help="suites to run")
+    parser.add_argument('--repeat', type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="a results JSON file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args(argv)
+
+    current = run(args.quick, args.only, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("{} benchmark(s) slower than the baseline".format(len(regressions)))
+            return 1
+    elif not args.output:
+        json.dump(current, sys.stdout, indent=2, sort_keys=True)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
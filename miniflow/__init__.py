@@ -0,0 +1,60 @@
+"""
+Miniflow - Neural Network Modeling from Scratch that imitates TensorFlow in a way!
+
+Importing the package only needs NumPy. `miniflow.datasets` and
+`miniflow.plotting` import scikit-learn and matplotlib the first time one of
+their functions is called, and `DataParallelTrainer` (multiprocessing) and
+`InferenceServer`/`LocalClient` (asyncio) import their modules the first
+time they are looked up.
+"""
+import importlib
+
+from miniflow.nodes import Node, Input, Add, Mul, Linear, Sigmoid, Dense, MSE, no_grad
+from miniflow.graph import (topological_sort, sort_nodes, sort_ancestors, infer_shapes,
+                            forward_pass, forward_and_backward, Graph)
+from miniflow.tracers import (TraceEvent, Tracer, TraceRecorder, PrintTracer,
+                              set_tracer, tracing, run_forward, run_changed, run_backward)
+from miniflow.optimizers import sgd_update, Optimizer, SGD, Momentum, RMSProp, Adam
+from miniflow.dtypes import DTypePolicy
+from miniflow.data import DataLoader, Standardize, open_array
+from miniflow.params import FlatParameters
+from miniflow.simplify import simplify
+from miniflow.profiler import Profiler
+from miniflow.executor import ThreadedExecutor
+from miniflow.checkpoint import save_checkpoint, load_checkpoint, CheckpointWriter
+from miniflow.serialize import save_graph, load_graph, LoadedGraph
+
+__all__ = [
+    'Node', 'Input', 'Add', 'Mul', 'Linear', 'Sigmoid', 'Dense', 'MSE', 'no_grad',
+    'topological_sort', 'sort_nodes', 'sort_ancestors', 'infer_shapes', 'forward_pass',
+    'forward_and_backward', 'Graph',
+    'TraceEvent', 'Tracer', 'TraceRecorder', 'PrintTracer', 'set_tracer', 'tracing',
+    'run_forward', 'run_changed', 'run_backward',
+    'sgd_update', 'Optimizer', 'SGD', 'Momentum', 'RMSProp', 'Adam',
+    'DTypePolicy',
+    'DataLoader', 'Standardize', 'open_array',
+    'DataParallelTrainer',
+    'FlatParameters',
+    'simplify',
+    'Profiler',
+    'ThreadedExecutor',
+    'InferenceServer', 'LocalClient',
+    'save_checkpoint', 'load_checkpoint', 'CheckpointWriter',
+    'save_graph', 'load_graph', 'LoadedGraph',
+]
+
+# Names whose modules have heavy standard library imports, by module.
+_LAZY = {
+    'DataParallelTrainer': 'miniflow.parallel',
+    'InferenceServer': 'miniflow.serving',
+    'LocalClient': 'miniflow.serving',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,152 @@
+"""
+Saving trainables to disk and loading them back memory-mapped.
+
+A checkpoint is a directory with one uncompressed `.npy` file per trainable
+and an `index.json` listing them in order. `.npy` files can be opened
+memory-mapped, so loading only maps the files: nothing is read until a
+value is used, and pages are shared between processes loading the same
+checkpoint.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+INDEX = 'index.json'
+
+
+def save_checkpoint(path, trainables):
+    """
+    Writes the values of `trainables` to the checkpoint directory `path`
+    (created if needed, overwritten if it exists).
+
+    Every file is written under a temporary name and then renamed, and the
+    index goes last, so a crash mid-write never leaves a checkpoint whose
+    index points to half-written files.
+
+    Arguments:
+
+        `path`: The checkpoint directory.
+        `trainables`: A list of `Input` Nodes representing weights/biases.
+    """
+    _write(path, [t.name for t in trainables], [t.value for t in trainables])
+
+
+def _check_values(names, values):
+    missing = [name for name, value in zip(names, values) if value is None]
+    if missing:
+        raise ValueError("Nothing to save for {}: they have no value".format(missing))
+
+
+def _write(path, names, values):
+    _check_values(names, values)
+    values = [np.asarray(value) for value in values]
+    os.makedirs(path, exist_ok=True)
+    entries = []
+    for i, (name, value) in enumerate(zip(names, values)):
+        # Names are only for people looking at the directory; keep them file-safe.
+        safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        filename = '{:03d}_{}.npy'.format(i, safe)
+        target = os.path.join(path, filename)
+        with open(target + '.tmp', 'wb') as f:
+            np.save(f, value, allow_pickle=False)
+        os.replace(target + '.tmp', target)
+        entries.append({'name': name, 'file': filename,
+                        'shape': list(value.shape), 'dtype': value.dtype.str})
+
+    index = os.path.join(path, INDEX)
+    with open(index + '.tmp', 'w') as f:
+        json.dump({'trainables': entries}, f, indent=2)
+    os.replace(index + '.tmp', index)
+
+
+def load_checkpoint(path, trainables=None, mmap_mode='c'):
+    """
+    Loads the values saved in the checkpoint directory `path`.
+
+    Arguments:
+
+        `path`: The checkpoint directory.
+        `trainables`: Optional, the `Input` Nodes to assign the values to, in
+            the order they were saved. Their current values, if any, must
+            have the saved shapes.
+        `mmap_mode`: How the files are mapped (see `np.load`): 'c' (the
+            default) gives writable copy-on-write arrays, so training can go
+            on from them without touching the files; 'r' gives read-only
+            arrays, enough for inference. None reads them into memory.
+
+    Returns the list of values.
+    """
+    with open(os.path.join(path, INDEX)) as f:
+        entries = json.load(f)['trainables']
+    values = [np.load(os.path.join(path, e['file']), mmap_mode=mmap_mode, allow_pickle=False)
+              for e in entries]
+
+    if trainables is not None:
+        if len(trainables) != len(values):
+            raise ValueError("Checkpoint has {} trainables, got {}".format(
+                len(values), len(trainables)))
+        for t, value in zip(trainables, values):
+            if t.value is not None and np.shape(t.value) != value.shape:
+                raise ValueError("{}: checkpoint value has shape {}, expected {}".format(
+                    t.name, value.shape, np.shape(t.value)))
+        for t, value in zip(trainables, values):
+            t.value = value
+    return values
+
+
+class CheckpointWriter(object):
+    """
+    Saves checkpoints on a background thread so training doesn't wait for
+    the disk.
+
+    `save` copies the values into snapshot arrays (kept between calls) on
+    the calling thread, which is all the training loop pays for, and
+    returns; the files are written while training goes on. A save first
+    waits for the previous one to finish, so at most one write is in flight.
+    Errors from a write are raised by the next `save` or `wait`.
+
+    Use it as a context manager (or call `close()`) to wait for the last write.
+    """
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix='CheckpointWriter')
+        self._pending = None
+        self._snapshots = []
+
+    def save(self, path, trainables):
+        """
+        Snapshots the values of `trainables` and writes them to `path` in the background.
+        """
+        self.wait()
+        _check_values([t.name for t in trainables], [t.value for t in trainables])
+        values = [np.asarray(t.value) for t in trainables]
+        if (len(self._snapshots) != len(values) or
+                any(s.shape != v.shape or s.dtype != v.dtype for s, v in zip(self._snapshots, values))):
+            self._snapshots = [np.empty_like(v) for v in values]
+        for snapshot, value in zip(self._snapshots, values):
+            np.copyto(snapshot, value)
+        self._pending = self._pool.submit(_write, path, [t.name for t in trainables], self._snapshots)
+
+    def wait(self):
+        """
+        Blocks until the last write has finished.
+        """
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.result()
+
+    def close(self):
+        """
+        Waits for the last write and stops the thread.
+        """
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
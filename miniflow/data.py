@@ -0,0 +1,211 @@
+"""
+Feeding training data to a graph in batches.
+"""
+import os
+import threading
+from queue import Full, Queue
+
+import numpy as np
+
+
+class DataLoader(object):
+    """
+    Iterates over arrays in batches, one epoch per `for` loop.
+
+    The example order is permuted once per epoch, so every example is seen
+    exactly once per epoch. Batches are slices of the arrays (views, no copy)
+    when not shuffling; when shuffling each batch is gathered with its indices
+    sorted, which keeps reads from the source arrays as sequential as possible.
+    While the caller works on one batch the next ones are prepared on a
+    background thread.
+
+    Data larger than memory can be given as `np.memmap`s or paths to `.npy`
+    files (opened memory-mapped). With `chunk_size` set, the rows are read
+    in large contiguous chunks, one sequential read per chunk, and shuffled
+    within the chunk; the order of the chunks is permuted every epoch. Memory
+    use then depends on `chunk_size` and `prefetch`, not on the dataset size.
+
+    Arguments:
+
+        `arrays`: One or more arrays (or `.npy` paths) with the same number of rows, e.g. `X_, y_`.
+        `batch_size`: The number of rows per batch.
+        `shuffle`: Permute the rows at the start of every epoch.
+        `drop_last`: Skip batches that have fewer than `batch_size` rows.
+        `prefetch`: How many batches to prepare ahead (0 disables the thread).
+        `seed`: Seed for the permutations, for reproducible runs.
+        `chunk_size`: Read this many rows at a time (rounded up to whole batches).
+            None reads every batch straight from the arrays.
+        `transforms`: One callable (or None) per array, applied to each batch,
+            e.g. a `Standardize` to normalize features on the fly.
+
+    Every iteration yields a tuple with one batch per array.
+    """
+    def __init__(self, *arrays, batch_size=32, shuffle=True, drop_last=False, prefetch=2, seed=None,
+                 chunk_size=None, transforms=None):
+        if not arrays:
+            raise ValueError("DataLoader needs at least one array")
+        arrays = tuple(open_array(a) for a in arrays)
+        self.num_examples = len(arrays[0])
+        for a in arrays:
+            if len(a) != self.num_examples:
+                raise ValueError("All arrays must have the same number of rows, got {}".format(
+                    [len(a) for a in arrays]))
+        if transforms is not None and len(transforms) != len(arrays):
+            raise ValueError("Expected one transform per array, got {} for {} arrays".format(
+                len(transforms), len(arrays)))
+
+        self.arrays = arrays
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.prefetch = prefetch
+        self.random_state = np.random.RandomState(seed)
+        self.chunk_size = chunk_size
+        self.transforms = transforms
+
+    def __len__(self):
+        """
+        The number of batches per epoch.
+        """
+        if self.drop_last:
+            return self.num_examples // self.batch_size
+        return -(-self.num_examples // self.batch_size)
+
+    def _batches(self):
+        """
+        Generates the batches of one epoch on the calling thread.
+        """
+        batches = self._read_batches() if self.chunk_size is None else self._read_chunked_batches()
+        if self.transforms is None:
+            return batches
+        return (tuple(a if t is None else t(a) for t, a in zip(self.transforms, batch))
+                for batch in batches)
+
+    def _read_batches(self):
+        order = self.random_state.permutation(self.num_examples) if self.shuffle else None
+        for i in range(len(self)):
+            start = i * self.batch_size
+            stop = min(start + self.batch_size, self.num_examples)
+            if order is None:
+                yield tuple(a[start:stop] for a in self.arrays)
+            else:
+                index = np.sort(order[start:stop])
+                yield tuple(np.take(a, index, axis=0) for a in self.arrays)
+
+    def _read_chunked_batches(self):
+        # Whole batches per chunk, so only the last chunk can end in a short batch.
+        rows = -(-self.chunk_size // self.batch_size) * self.batch_size
+        starts = np.arange(0, self.num_examples, rows)
+        if self.shuffle:
+            self.random_state.shuffle(starts)
+
+        for start in starts:
+            stop = min(start + rows, self.num_examples)
+            # One sequential read per array (memory-mapped data is copied into memory here).
+            chunk = [np.array(a[start:stop]) if isinstance(a, np.memmap) else a[start:stop]
+                     for a in self.arrays]
+            count = stop - start
+            order = self.random_state.permutation(count) if self.shuffle else None
+            for b in range(0, count, self.batch_size):
+                end = min(b + self.batch_size, count)
+                if self.drop_last and end - b < self.batch_size:
+                    break
+                if order is None:
+                    yield tuple(c[b:end] for c in chunk)
+                else:
+                    index = np.sort(order[b:end])
+                    yield tuple(np.take(c, index, axis=0) for c in chunk)
+
+    def __iter__(self):
+        if self.prefetch <= 0:
+            return self._batches()
+        return self._prefetched()
+
+    def _prefetched(self):
+        """
+        Generates the batches of one epoch, preparing them on a background thread.
+        """
+        queue = Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # Wait for room in the queue, giving up if the consumer went away.
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for batch in self._batches():
+                    if not put(batch):
+                        return
+                put(done)
+            except BaseException as e:
+                put(e)
+
+        worker = threading.Thread(target=produce, name="DataLoader", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Lets the producer exit if the loop was left early.
+            stop.set()
+
+
+def open_array(source):
+    """
+    Returns `source` as an array; paths to `.npy` files are opened
+    memory-mapped (read-only) instead of being loaded.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return np.load(source, mmap_mode='r')
+    return source
+
+
+class Standardize(object):
+    """
+    Normalizes batches to zero mean and unit variance: `(x - mean) / std`.
+
+    Use `Standardize.fit` to compute the statistics in one streaming pass,
+    so they can be obtained for data that does not fit in memory.
+    """
+    def __init__(self, mean, std):
+        self.mean = np.asarray(mean)
+        self.std = np.asarray(std)
+
+    @classmethod
+    def fit(cls, array, chunk_size=65536):
+        """
+        Computes the per-column mean and standard deviation of `array`
+        (or a `.npy` path), reading `chunk_size` rows at a time.
+        """
+        array = open_array(array)
+        count = 0
+        total = 0.
+        total_sq = 0.
+        for start in range(0, len(array), chunk_size):
+            chunk = np.asarray(array[start:start + chunk_size], dtype=np.float64)
+            count += len(chunk)
+            total = total + chunk.sum(axis=0)
+            total_sq = total_sq + np.square(chunk).sum(axis=0)
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - np.square(mean), 0.))
+        return cls(mean, std)
+
+    def __call__(self, batch):
+        # Keep floating batches in their dtype (e.g. float32).
+        dtype = batch.dtype if batch.dtype.kind == 'f' else np.float64
+        out = np.subtract(batch, self.mean, dtype=dtype)
+        np.divide(out, self.std, out=out)
+        return out
@@ -0,0 +1,29 @@
+"""
+Datasets used by the examples.
+
+scikit-learn is only imported when a loader is called, so importing
+miniflow does not pay for it.
+"""
+import numpy as np
+
+
+def load_boston(normalize=True):
+    """
+    Loads the Boston housing dataset.
+
+    Arguments:
+
+        `normalize`: Scale every feature to zero mean and unit variance.
+
+    Returns the features `X` (506 x 13) and the targets `y` (506,).
+    """
+    from sklearn.datasets import load_boston as _load_boston
+
+    data = _load_boston()
+    X = data['data']
+    y = data['target']
+
+    if normalize:
+        X = (X - np.mean(X, axis=0)) / np.std(X, axis=0)
+
+    return X, y
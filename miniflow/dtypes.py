@@ -0,0 +1,32 @@
+"""
+Dtype policies: which dtypes a `Graph` computes in.
+"""
+import numpy as np
+
+
+class DTypePolicy(object):
+    """
+    The dtypes a `Graph` runs in.
+
+    Every value fed through the graph is cast to `compute`, so all values,
+    gradients and trainable updates stay in that dtype (float32 halves the
+    memory and roughly doubles BLAS throughput compared to float64).
+
+    Arguments:
+
+        `compute`: The dtype of every fed value, and hence of every value and gradient.
+        `loss`: The dtype cost nodes accumulate their result in, e.g. float64
+            on top of float32 compute. None accumulates in `compute`.
+    """
+    def __init__(self, compute=np.float32, loss=None):
+        self.compute = np.dtype(compute)
+        self.loss = None if loss is None else np.dtype(loss)
+
+    def cast(self, value):
+        """
+        Returns `value` as an array of the compute dtype (no copy if it already is one).
+        """
+        return np.asarray(value, dtype=self.compute)
+
+    def __repr__(self):
+        return "DTypePolicy(compute={}, loss={})".format(self.compute, self.loss)
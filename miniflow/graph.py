@@ -0,0 +1,613 @@
+"""
+Ordering and running a miniflow graph.
+"""
+import math
+import weakref
+from collections import deque
+
+import numpy as np
+
+from miniflow import nodes
+from miniflow.nodes import Input, no_grad, reusing_outputs, using_dtype_policy
+from miniflow.tracers import run_forward, run_changed, run_backward
+
+
+def topological_sort(feed_dict):
+    """
+    Sort the nodes in topological order using Kahn's Algorithm.
+
+    `feed_dict`: A dictionary where the key is a `Input` Node and the value is 
+    the respective value feed to that Node.
+
+    Returns a list of sorted nodes.
+    """
+    L = sort_nodes(feed_dict.keys())
+
+    #Assign values to the input nodes
+    for n in L:
+        if isinstance(n, Input) and not n.constant:
+            n.value = feed_dict[n]
+
+    return L
+
+
+def sort_nodes(input_nodes):
+    """
+    Sort the nodes reachable from `input_nodes` in topological order
+    using Kahn's Algorithm.
+
+    Unlike `topological_sort` this does not touch any node's value, so
+    the result can be computed once and reused with different feeds.
+
+    `input_nodes`: An iterable of `Input` Nodes (e.g. the keys of a feed_dict).
+        Constant inputs used by the reachable nodes are added to them, along
+        with the nodes computed from constant inputs alone.
+
+    Returns a list of sorted nodes. Raises `ValueError` if a reachable node
+    depends on an input that is not fed, or if the graph has a cycle.
+    """
+    input_nodes = [n for n in input_nodes]
+
+    # Discover every node reachable from the inputs, visiting each one once.
+    visited = set(input_nodes)
+    queue = deque(input_nodes)
+    # Whether each node met on the way up from a discovered one is computed
+    # from constant inputs alone, shared so no node is classified twice.
+    constant = {}
+    while queue:
+        n = queue.popleft()
+        for m in n.outbound_nodes:
+            if m not in visited:
+                visited.add(m)
+                queue.append(m)
+                for i in _constant_ancestors(m, visited, constant):
+                    visited.add(i)
+                    if not i.inbound_nodes:
+                        input_nodes.append(i)
+
+    # A node that depends on something outside the reachable set can never run,
+    # e.g. an `Input` that was left out of the feed_dict.
+    unreachable = [n for n in visited if any(i not in visited for i in n.inbound_nodes)]
+    if unreachable:
+        raise ValueError("Nodes {} depend on inputs that are not fed: {}".format(
+            [n.name for n in unreachable],
+            sorted({i.name for n in unreachable for i in n.inbound_nodes if i not in visited})))
+
+    # Count the incoming edges of each node (an input used twice counts twice).
+    in_degree = {n: len(n.inbound_nodes) for n in visited}
+
+    L = []
+    S = deque(n for n in input_nodes if in_degree[n] == 0)
+    while S:
+        n = S.popleft()
+        L.append(n)
+        for m in n.outbound_nodes:
+            if m not in in_degree:
+                # A consumer of a constant input that is not reachable from the feed.
+                continue
+            in_degree[m] -= 1
+            # if no other incoming edges add to S
+            if in_degree[m] == 0:
+                S.append(m)
+
+    # Whatever is left still has incoming edges, which only a cycle can explain.
+    if len(L) != len(visited):
+        raise ValueError("Graph has a cycle through nodes: {}".format(
+            [n.name for n in visited if in_degree[n] > 0]))
+
+    return L
+
+
+def _constant_ancestors(node, visited, constant):
+    """
+    Returns the ancestors of `node` outside `visited` that are computed from
+    constant inputs alone, and those constant inputs. No fed input reaches
+    them along outbound edges, so they are found along inbound ones.
+
+    `constant` maps the nodes classified so far to True for the constant
+    ones, False for the others (None while a node's inputs are being
+    visited). It is updated, and nodes already in it are not walked again,
+    so over a whole sort every node is classified at most once.
+    """
+    found = []
+    for root in node.inbound_nodes:
+        if root in visited or root in constant:
+            continue
+        constant[root] = None
+        stack = [(root, iter(root.inbound_nodes))]
+        while stack:
+            n, inbound = stack[-1]
+            for m in inbound:
+                if m not in visited and m not in constant:
+                    constant[m] = None
+                    stack.append((m, iter(m.inbound_nodes)))
+                    break
+            else:
+                stack.pop()
+                if isinstance(n, Input):
+                    constant[n] = n.constant
+                else:
+                    constant[n] = all(constant.get(m) for m in n.inbound_nodes)
+                if constant[n]:
+                    found.append(n)
+    return found
+
+
+def forward_pass(output_node, sorted_nodes):
+    """
+    Performs a forward pass through a list of sorted nodes.
+
+    Arguments:
+
+        `output_node`: A node in the graph, should be the output node (have no outgoing edges).
+        `sorted_nodes`: A topologically sorted list of nodes.
+
+    Returns the output Node's value
+    """
+
+    run_forward(sorted_nodes)
+
+    return output_node.value
+
+
+def forward_and_backward(graph):
+    """
+    Performs a forward pass and a backward pass through a list of sorted Nodes.
+
+    Arguments:
+
+        `graph`: The result of calling `topological_sort`.
+    """
+    # Forward pass
+    run_forward(graph)
+
+    # Backward pass
+    # see: https://docs.python.org/2.3/whatsnew/section-slices.html
+    run_backward(graph[::-1])
+
+
+# Compiled plans shared between the `Graph` objects alive over the same
+# inputs, keyed by the input nodes. Only the graphs hold their plans, so a
+# plan (and the nodes it references) goes away with the last graph using it.
+_plan_cache = weakref.WeakValueDictionary()
+
+
+class _Plan(object):
+    """
+    A topological order, its reverse, and the `_PlanState` telling when it
+    is out of date.
+    """
+    def __init__(self, sorted_nodes):
+        self.sorted_nodes = sorted_nodes
+        self.reversed_nodes = sorted_nodes[::-1]
+        self.state = nodes._PlanState(sorted_nodes)
+
+
+class Graph(object):
+    """
+    A compiled, reusable execution plan for the graph reachable from a set
+    of `Input` nodes.
+
+    The topological order (and its reverse, used by the backward pass) is
+    computed once and cached; `feed()` only assigns new values to the inputs.
+    The plan is recompiled automatically when nodes are connected to the graph.
+
+    Arguments:
+
+        `inputs`: A feed_dict (which is also fed) or an iterable of `Input` Nodes.
+        `dtype_policy`: A `DTypePolicy`; fed values, and the values the
+            inputs already hold when the graph is compiled, are cast to its
+            compute dtype. The graph's nodes run under it, without affecting
+            other graphs over the same nodes. None keeps whatever dtype is fed.
+        `executor`: Runs the forward and backward passes of `forward_and_backward`
+            and `fetch`, e.g. a `ThreadedExecutor` to run independent branches
+            in parallel. None runs the nodes one after another.
+    """
+    def __init__(self, inputs, dtype_policy=None, executor=None):
+        self.input_nodes = [n for n in inputs]
+        self._input_set = set(self.input_nodes)
+        self.dtype_policy = dtype_policy
+        self.executor = executor
+        self._plan = None
+        self._plan_state = None
+        self._fetch_plans = {}
+        self.checkpoints = None
+        self._segments = None
+        self._shape_key = None
+        if isinstance(inputs, dict):
+            self.feed(inputs)
+
+    def compile(self):
+        """
+        Sorts the graph, or picks up an already sorted plan from the cache.
+        Runs on first use; call it directly to sort (and validate) up front.
+        """
+        key = self._plan_key()
+        plan = _plan_cache.get(key)
+        if plan is None or plan.state.stale:
+            plan = _cache_plan(key, sort_nodes(self.input_nodes))
+        self._plan = plan
+        self.sorted_nodes, self.reversed_nodes = plan.sorted_nodes, plan.reversed_nodes
+        self._plan_state = plan.state
+        self._segments = None
+        self._shape_key = None
+        self._cast_inputs(self.sorted_nodes)
+
+    @classmethod
+    def from_sorted(cls, sorted_nodes, dtype_policy=None, executor=None, outputs=()):
+        """
+        Builds a `Graph` over nodes that are already in topological order
+        (e.g. loaded by `load_graph`), using that order as the plan instead
+        of sorting again. Every `Input` among them is an input of the graph.
+
+        `outputs`: Nodes among them to be fetched (together or one at a
+            time); their fetch plans are taken from the same order.
+        """
+        sorted_nodes = list(sorted_nodes)
+        graph = cls([n for n in sorted_nodes if isinstance(n, Input)], dtype_policy, executor)
+        graph._plan = _cache_plan(graph._plan_key(), sorted_nodes)
+        graph.compile()
+        if outputs:
+            outputs = tuple(outputs)
+            for fetched in dict.fromkeys([outputs] + [(n,) for n in outputs]):
+                graph._add_fetch_plan(fetched, _ancestors_in(sorted_nodes, fetched))
+        return graph
+
+    def _plan_key(self):
+        return frozenset(self.input_nodes)
+
+    def _ensure_compiled(self):
+        if self._plan_state is None or self._plan_state.stale:
+            self.compile()
+
+    def feed(self, feed_dict):
+        """
+        Assigns new values to `Input` nodes without touching the plan.
+
+        `feed_dict`: A dictionary where the key is a `Input` Node and the value is
+        the respective value feed to that Node. Inputs the graph was not
+        built with are added to it.
+        """
+        policy = self.dtype_policy
+        for n, value in feed_dict.items():
+            n.value = value if policy is None else policy.cast(value)
+            if n not in self._input_set:
+                # A new input (e.g. labels fed only for training) changes the plan.
+                self.input_nodes.append(n)
+                self._input_set.add(n)
+                self._plan_state = None
+
+    def run(self, output_node, feed_dict=None):
+        """
+        Performs a forward pass and returns the output Node's value.
+
+        Only the nodes `output_node` depends on are run (see `fetch`).
+        """
+        return self.fetch(output_node, feed_dict)
+
+    def fetch(self, output_nodes, feed_dict=None, incremental=False):
+        """
+        Computes `output_nodes` and returns their value (a list of values if
+        a list of nodes is given).
+
+        Only the nodes the outputs depend on are run, so e.g. a prediction
+        can be fetched without running the cost node or feeding the labels.
+        The slice of the graph to run is worked out once per set of outputs,
+        and its shapes whenever those fed change, so a feed whose shapes
+        don't fit raises a `ValueError` naming the node before anything runs.
+
+        With `incremental=True` only the nodes downstream of inputs fed (or
+        marked dirty) since the previous incremental run are recomputed;
+        the others keep their cached values. Inputs modified in place must
+        be marked with `Input.mark_dirty()` for this (the optimizers do).
+        """
+        single = isinstance(output_nodes, nodes.Node)
+        outputs = (output_nodes,) if single else tuple(output_nodes)
+        if feed_dict is not None:
+            self.feed(feed_dict)
+
+        with using_dtype_policy(self.dtype_policy):
+            order, _ = self._fetch_plan(outputs)
+            if incremental:
+                run_changed(order)
+            else:
+                self._runners()[0](order)
+
+        return outputs[0].value if single else [n.value for n in outputs]
+
+    def forward_and_backward(self, feed_dict=None):
+        """
+        Performs a forward pass and a backward pass through the compiled plan.
+
+        With checkpointing on (see `set_checkpoints`), intermediate values
+        are dropped during the forward pass and recomputed for the backward
+        pass, so afterwards only the kept nodes hold values.
+        """
+        self._ensure_compiled()
+        if feed_dict is not None:
+            self.feed(feed_dict)
+        with using_dtype_policy(self.dtype_policy):
+            self._forward_and_backward()
+
+    def _forward_and_backward(self):
+        forward, backward = self._runners()
+        if self.checkpoints is None:
+            if self._shape_key != _input_signature(self.sorted_nodes):
+                self.infer_shapes()
+            with reusing_outputs():
+                forward(self.sorted_nodes)
+            backward(self.reversed_nodes)
+            return
+
+        if self._segments is None:
+            self._segments = _segment_plan(self.sorted_nodes, self.checkpoints)
+        *segments, last = self._segments
+        for segment, dropped in segments:
+            forward(segment)
+            for n in dropped:
+                n.value = None
+        # The last segment is needed right away by the backward pass.
+        forward(last[0])
+        backward(last[0][::-1])
+        _release_gradients(last[0])
+        for segment, dropped in reversed(segments):
+            forward(dropped)
+            backward(segment[::-1])
+            _release_gradients(segment)
+            for n in dropped:
+                n.value = None
+
+    def _runners(self):
+        if self.executor is None:
+            return run_forward, run_backward
+        return self.executor.run_forward, self.executor.run_backward
+
+    def infer_shapes(self):
+        """
+        Works out the shape and dtype of every node from the values of the
+        inputs, and allocates the arrays the nodes write their values into
+        during `forward_and_backward` (so each step overwrites the values of
+        the previous one). Raises `ValueError` if shapes don't fit together.
+
+        Runs before the first `forward_and_backward` and again whenever the
+        shapes or dtypes fed change; call it directly to check up front.
+        """
+        self._ensure_compiled()
+        with using_dtype_policy(self.dtype_policy):
+            infer_shapes(self.sorted_nodes)
+        self._shape_key = _input_signature(self.sorted_nodes)
+
+    def set_checkpoints(self, checkpoints='sqrt'):
+        """
+        Turns on gradient checkpointing for `forward_and_backward`, trading
+        compute for memory.
+
+        The sorted nodes are split into segments, each ending at a checkpoint.
+        The forward pass keeps the values of the checkpoints (and of nodes
+        used by a later segment) and drops the others at the end of every
+        segment; the backward pass recomputes them one segment at a time.
+        Peak memory is then that of the kept values plus one segment.
+
+        `checkpoints`: The nodes whose values are kept, 'sqrt' to keep every
+            sqrt(N)-th of the N computed nodes (about 2 * sqrt(N) values
+            alive for one extra forward pass), or None to turn checkpointing off.
+        """
+        self.checkpoints = checkpoints
+        self._segments = None
+        self._shape_key = None
+        if checkpoints is not None and self._plan_state is not None:
+            # Values are dropped and recomputed from now on, so don't keep
+            # arrays to write them into.
+            for n in self.sorted_nodes:
+                n.out = None
+                n._buffers.pop('value', None)
+
+    def infer(self, output_nodes, feed_dict=None):
+        """
+        Performs a forward pass for inference only and returns the value of
+        `output_nodes` (a list of values if a list of nodes is given).
+
+        Like `fetch` only the nodes the outputs depend on are run. No state
+        for a backward pass is kept, and the value of every intermediate
+        node is dropped as soon as its last consumer has run, so peak memory
+        stays close to that of the widest layer. Afterwards only the `Input`
+        nodes and the requested outputs hold values.
+        """
+        single = isinstance(output_nodes, nodes.Node)
+        outputs = (output_nodes,) if single else tuple(output_nodes)
+        if feed_dict is not None:
+            self.feed(feed_dict)
+
+        with using_dtype_policy(self.dtype_policy), no_grad():
+            order, releases = self._fetch_plan(outputs)
+            run_forward(order, releases)
+
+        return outputs[0].value if single else [n.value for n in outputs]
+
+    def _fetch_plan(self, outputs):
+        """
+        Returns the nodes needed for `outputs` in topological order, and for
+        each of them the nodes whose last consumer it is. Checks that every
+        `Input` needed has a value, and works out the shapes of the nodes
+        (without preallocating) when those of the inputs change.
+        """
+        plan = self._fetch_plans.get(outputs)
+        if plan is None or plan[0].stale:
+            plan = self._add_fetch_plan(outputs, sort_ancestors(outputs))
+
+        _, order, releases, inputs, shape_key = plan
+        missing = [n.name for n in inputs if n.value is None]
+        if missing:
+            raise ValueError("Inputs {} are needed for {} but not fed".format(
+                missing, [n.name for n in outputs]))
+        signature = _input_signature(inputs)
+        if signature != shape_key:
+            infer_shapes(order, preallocate=False)
+            plan[4] = signature
+        return order, releases
+
+    def _add_fetch_plan(self, outputs, order):
+        self._cast_inputs(order)
+        plan = [nodes._PlanState(order), order, _release_plan(order, outputs),
+                [n for n in order if isinstance(n, Input)], None]
+        self._fetch_plans[outputs] = plan
+        return plan
+
+
+    def _cast_inputs(self, plan_nodes):
+        """
+        Casts the values the inputs among `plan_nodes` already hold (e.g.
+        trainables set before the graph was built) to the policy's compute dtype.
+        """
+        policy = self.dtype_policy
+        if policy is None:
+            return
+        for n in plan_nodes:
+            if (isinstance(n, Input) and n.value is not None
+                    and np.result_type(n.value) != policy.compute):
+                n.value = policy.cast(n.value)
+
+
+def _cache_plan(key, sorted_nodes):
+    plan = _plan_cache[key] = _Plan(sorted_nodes)
+    return plan
+
+
+def infer_shapes(sorted_nodes, preallocate=True):
+    """
+    Sets the `shape` and `dtype` of every node of `sorted_nodes` from those
+    of its inbound nodes, starting from the values of the inputs, and gives
+    the nodes that can use one a preallocated `out` array of that shape.
+
+    Raises `ValueError` naming the first node whose inputs don't fit together.
+
+    `preallocate`: False only sets the shapes and dtypes, leaving the `out`
+        arrays alone (e.g. to check a feed before running inference).
+    """
+    for n in sorted_nodes:
+        spec = n.infer_shape()
+        n.shape, n.dtype = (None, None) if spec is None else spec
+        if not preallocate:
+            continue
+        if spec is not None and n.preallocates:
+            n.out = n._buffer('value', n.shape, n.dtype)
+        else:
+            n.out = None
+
+
+def sort_ancestors(output_nodes):
+    """
+    Sort `output_nodes` and every node they depend on in topological order
+    (a depth-first walk along the inbound edges).
+
+    Returns a list of sorted nodes. Raises `ValueError` if the graph has a cycle.
+    """
+    L = []
+    # 1 while a node's inputs are being visited, 2 once it is in L
+    state = {}
+    for root in output_nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(root.inbound_nodes))]
+        while stack:
+            n, inbound = stack[-1]
+            for m in inbound:
+                seen = state.get(m)
+                if seen is None:
+                    state[m] = 1
+                    stack.append((m, iter(m.inbound_nodes)))
+                    break
+                if seen == 1:
+                    raise ValueError("Graph has a cycle through node: {}".format(m.name))
+            else:
+                stack.pop()
+                state[n] = 2
+                L.append(n)
+    return L
+
+
+def _input_signature(sorted_nodes):
+    return tuple([(np.shape(n.value), getattr(n.value, 'dtype', None))
+                  for n in sorted_nodes if isinstance(n, Input)])
+
+
+def _ancestors_in(sorted_nodes, output_nodes):
+    """
+    Returns the nodes of `sorted_nodes` that `output_nodes` depend on (and
+    the outputs themselves), keeping their order: a slice of an existing
+    topological order, without sorting again.
+    """
+    needed = set(output_nodes)
+    for n in reversed(sorted_nodes):
+        if n in needed:
+            needed.update(n.inbound_nodes)
+    return [n for n in sorted_nodes if n in needed]
+
+
+def _segment_plan(sorted_nodes, checkpoints):
+    """
+    Splits `sorted_nodes` into segments ending at the `checkpoints` ('sqrt'
+    picks them). Returns a list of (segment, dropped) pairs, where `dropped`
+    lists the nodes of the segment whose values can be recomputed from the
+    kept ones; nothing is dropped in the last segment.
+    """
+    computed = [n for n in sorted_nodes if not isinstance(n, Input)]
+    if checkpoints == 'sqrt':
+        step = max(1, int(math.ceil(math.sqrt(len(computed)))))
+        checkpoints = computed[step - 1::step]
+    checkpoints = set(checkpoints)
+
+    segments = [[]]
+    index = {}
+    for n in sorted_nodes:
+        segments[-1].append(n)
+        index[n] = len(segments) - 1
+        if n in checkpoints:
+            segments.append([])
+    if not segments[-1]:
+        segments.pop()
+
+    plan = []
+    for i, segment in enumerate(segments[:-1]):
+        # Inputs, checkpoints, outputs and values crossing into a later
+        # segment are kept.
+        dropped = [n for n in segment
+                   if not isinstance(n, Input) and n not in checkpoints and n.outbound_nodes
+                   and all(index.get(m) == i for m in n.outbound_nodes)]
+        plan.append((segment, dropped))
+    plan.append((segments[-1], []))
+    return plan
+
+
+def _release_gradients(segment):
+    """
+    Drops what the backward pass of `segment` no longer needs once it has
+    run: the partials the consumers of its nodes hold for them, and the
+    scratch buffers of its nodes. Partials for `Input` nodes are kept, as
+    they are the gradients of the trainables.
+    """
+    for n in segment:
+        if isinstance(n, Input):
+            continue
+        for key in [key for key in n._buffers if not isinstance(key, nodes.Node)]:
+            del n._buffers[key]
+        for m in n.outbound_nodes:
+            m.gradients.pop(n, None)
+            m._buffers.pop(n, None)
+
+
+def _release_plan(sorted_nodes, outputs):
+    """
+    For each node of `sorted_nodes`, lists the nodes whose last consumer it is.
+    Inputs and `outputs` are never listed.
+    """
+    position = {n: i for i, n in enumerate(sorted_nodes)}
+    keep = set(outputs)
+    releases = [[] for _ in sorted_nodes]
+    for i, n in enumerate(sorted_nodes):
+        if n in keep or isinstance(n, Input):
+            continue
+        last = max([position[m] for m in n.outbound_nodes if m in position], default=i)
+        releases[last].append(n)
+    return releases
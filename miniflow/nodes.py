@@ -0,0 +1,832 @@
+"""
+The nodes of a miniflow graph: the `Node` base class, `Input` and the operations.
+"""
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+
+
+class _PlanState(object):
+    """
+    Tells a compiled execution plan when the graph structure it was built
+    from has changed: it is registered with every node of the plan, and
+    becomes `stale` as soon as an edge into or out of one of them is added
+    or removed. Changes elsewhere leave it alone.
+
+    Nodes only hold weak references to it, so it goes away with the plans
+    (and graphs) using it.
+    """
+    def __init__(self, plan_nodes):
+        self.stale = False
+        for n in plan_nodes:
+            if n._plans is None:
+                n._plans = weakref.WeakSet()
+            n._plans.add(self)
+
+
+def _edges_changed(changed):
+    """
+    Marks the plans built over any of the `changed` nodes as stale.
+    """
+    for n in changed:
+        if n._plans:
+            for plan in list(n._plans):
+                plan.stale = True
+            n._plans.clear()
+
+# False while running inference only (see `no_grad`): nodes then skip
+# keeping anything that only the backward pass would need. A context
+# variable, so a graph running inference on one thread (or asyncio task)
+# doesn't affect training running on another.
+_grad_enabled = ContextVar('grad_enabled', default=True)
+
+
+@contextmanager
+def no_grad():
+    """
+    Within this block nodes only compute values; no state for a backward
+    pass is kept, so `backward()` must not be called on them.
+
+    Like the other run modes it only applies to the current thread or
+    asyncio task (and to the threads a `ThreadedExecutor` runs nodes on).
+    """
+    token = _grad_enabled.set(False)
+    try:
+        yield
+    finally:
+        _grad_enabled.reset(token)
+
+
+# True while nodes may write their values into the buffers set up by
+# `infer_shapes` (see `reusing_outputs`).
+_reuse_outputs = ContextVar('reuse_outputs', default=False)
+
+
+@contextmanager
+def reusing_outputs():
+    """
+    Within this block nodes write their values into their preallocated
+    `out` arrays, overwriting the values of the previous run.
+    """
+    token = _reuse_outputs.set(True)
+    try:
+        yield
+    finally:
+        _reuse_outputs.reset(token)
+
+
+# The `DTypePolicy` of the `Graph` running the nodes, if any (see
+# `using_dtype_policy`). Per thread or task like the modes above, so graphs
+# with different policies can share nodes.
+_dtype_policy = ContextVar('dtype_policy', default=None)
+
+
+@contextmanager
+def using_dtype_policy(policy):
+    """
+    Within this block nodes run under `policy` (a `DTypePolicy`, or None for
+    none), e.g. cost nodes accumulate in its loss dtype. A `Graph` sets its
+    own policy while it runs.
+    """
+    token = _dtype_policy.set(policy)
+    try:
+        yield
+    finally:
+        _dtype_policy.reset(token)
+
+
+def _loss_dtype():
+    policy = _dtype_policy.get()
+    return None if policy is None else policy.loss
+
+
+class Node(object):
+    """
+    Base class for nodes in the network.
+    Should have following properties:
+    1. Should hold its value
+    2. Should know what are incoming nodes
+    3. Should know to which node(s) it outputs the value
+    4. Should hold the gradient calculated
+
+    Arguments:
+
+        `inbound_nodes`: A list of nodes with edges into this node.
+    """
+    def __init__(self, inbound_nodes=[]):
+        """
+        Node's constructor (runs when the object is instantiated). Sets
+        properties that all nodes need.
+        """
+        self.name = "Node"
+
+        # Bumped whenever this node's value changes (an `Input` being fed,
+        # a node being recomputed by an incremental run), and the versions
+        # of the inbound nodes this node's value was last computed from.
+        self.version = 0
+        self._seen_versions = None
+        
+        # The eventual value of this node. Set by running
+        # the forward() method.
+        self.value = None
+        
+        # A list of nodes with edges into this node.
+        # Just like input arguments to any function/method
+        self.inbound_nodes = inbound_nodes
+
+        # A list of nodes that this node outputs to.
+        # Is it possible to know which node I am gonna send the result? Definelty NO!!!
+        self.outbound_nodes = []
+        
+        # The `_PlanState`s of the compiled plans this node is part of (a
+        # `WeakSet`, created by the first one).
+        self._plans = None
+
+        # Keys are the inputs to this node and
+        # their values are the partials of this node with
+        # respect to that input.
+        self.gradients = {}
+
+        # Arrays kept between steps (e.g. gradient buffers) so that
+        # backward passes can write into them instead of allocating.
+        self._buffers = {}
+
+        # The shape and dtype of the value as worked out by `infer_shapes`
+        # (None when unknown), and the array to write the value into.
+        self.shape = None
+        self.dtype = None
+        self.out = None
+        
+        # Sets this node as an outbound node for all of
+        # this node's inputs.
+        # Hey there I am your output node, do send me your results, ok!
+        for node in inbound_nodes:
+            node.outbound_nodes.append(self)
+
+        # New edges were added, so the plans over the inbound nodes are now stale.
+        _edges_changed(inbound_nodes)
+
+    def forward(self):
+        """
+        Every node that uses this class as a base class will
+        need to define its own `forward` method.
+        """
+        raise NotImplementedError
+
+    def backward(self):
+        """
+        Every node that uses this class as a base class will
+        need to define its own `backward` method.
+        """
+        raise NotImplementedError
+
+    # Whether `forward` can write into a preallocated `out` array.
+    preallocates = False
+
+    def infer_shape(self):
+        """
+        Returns the (shape, dtype) of the value `forward` will compute from
+        the `shape` and `dtype` of the inbound nodes, or None if it can't
+        tell. Raises `ValueError` if the inbound shapes don't fit together.
+        """
+        return None
+
+    def _inbound_specs(self):
+        """
+        Returns the (shape, dtype) of every inbound node, or None if any is unknown.
+        """
+        if any(n.shape is None for n in self.inbound_nodes):
+            return None
+        return [(n.shape, n.dtype) for n in self.inbound_nodes]
+
+    def _output(self):
+        """
+        Returns the array to write the value into, or None to allocate one.
+        """
+        return self.out if _reuse_outputs.get() else None
+
+    def __getstate__(self):
+        # Gradients and scratch buffers are rebuilt by the next backward
+        # pass, so don't copy them when a node is pickled (e.g. when a
+        # graph is sent to worker processes).
+        state = self.__dict__.copy()
+        state['gradients'] = {}
+        state['_buffers'] = {}
+        # Plans are built again wherever the node ends up.
+        state['_plans'] = None
+        return state
+
+    def _buffer(self, key, shape, dtype):
+        """
+        Returns the array stored under `key`, allocating it only the first
+        time or when the requested shape or dtype changes. Its contents are
+        whatever was last written to it.
+        """
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._buffers[key] = np.empty(shape, dtype)
+        return buf
+
+    def _gradient_buffer(self, node, shape, dtype):
+        """
+        Returns the array to write the partial with respect to `node` into.
+
+        If `node` keeps its gradient in a flat buffer (see `FlatParameters`)
+        and this node is its only consumer, the partial is written straight
+        into that slot; otherwise a persistent buffer of this node is used.
+        """
+        slot = getattr(node, 'gradient_slot', None)
+        if (slot is not None and slot.shape == shape and slot.dtype == dtype
+                and len(node.outbound_nodes) == 1):
+            return slot
+        return self._buffer(node, shape, dtype)
+
+    def _outbound_gradient(self):
+        """
+        Returns the partial of the cost with respect to this node, summed
+        over all outbound nodes.
+
+        With a single outbound node (the usual case) its gradient array is
+        returned as is, so callers must only read from it. Otherwise the
+        partials are accumulated in place into a persistent buffer.
+        """
+        # A node using this one several times (e.g. `Add(x, x)`) holds the
+        # sum of its partials under one key, so each consumer counts once.
+        grads = [n.gradients[self] for n in dict.fromkeys(self.outbound_nodes)]
+        if len(grads) == 1:
+            return grads[0]
+        if not grads:
+            return 0
+        total = self._buffer('outbound_gradient',
+                             np.broadcast_shapes(*[np.shape(g) for g in grads]),
+                             np.result_type(*grads))
+        np.copyto(total, grads[0])
+        for g in grads[1:]:
+            np.add(total, g, out=total)
+        return total
+
+
+class Input(Node):
+    """
+    A generic input into the network.
+
+    Arguments:
+
+        `name`: The name of the input.
+        `constant`: Whether the value is frozen (set once, never fed or
+            trained). Constant inputs count as fed wherever they are used,
+            and `simplify` folds the nodes computed only from them.
+    """
+    def __init__(self, name='Input', constant=False):
+        # The base class constructor has to run to set all
+        # the properties here.
+        #
+        # The most important property on an Input is value.
+        # self.value is set during `topological_sort` later.
+        Node.__init__(self)
+        self.name = name
+        self.constant = constant
+
+        # A view into a flat gradient buffer, set by `FlatParameters`;
+        # when set, the gradient of this input is always written there.
+        self.gradient_slot = None
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.version += 1
+
+    def infer_shape(self):
+        value = self.value
+        if value is None:
+            return None
+        return np.shape(value), np.asarray(value).dtype
+
+    def mark_dirty(self):
+        """
+        Records that the value was modified in place, so incremental runs
+        (see `Graph.fetch`) recompute the nodes that depend on it. Assigning
+        to `value` does this already.
+        """
+        self.version += 1
+
+    # NOTE: Input node is the only node where the value
+    # may be passed as an argument to forward().
+    #
+    # All other node implementations should get the value
+    # of the previous node from self.inbound_nodes
+    #
+    # Example:
+    # val0 = self.inbound_nodes[0].value
+    def forward(self, value=None):
+        # Overwrite the value if one is passed in.
+        if value is not None:
+            self.value = value
+
+    def backward(self):
+        # An Input node has no inputs so the gradient (derivative)
+        # is zero.
+        # The key, `self`, is reference to this object.
+        # Weights and bias may be inputs, so you need to sum
+        # the gradient from output gradients.
+        grad = self._outbound_gradient()
+        slot = self.gradient_slot
+        if slot is not None and grad is not slot:
+            np.copyto(slot, grad)
+            grad = slot
+        self.gradients[self] = grad
+
+    def __getstate__(self):
+        state = Node.__getstate__(self)
+        state['gradient_slot'] = None
+        return state
+
+
+class Add(Node):
+    """
+    Adds any number of inputs, with NumPy broadcasting.
+    """
+    def __init__(self, *inputs):
+        Node.__init__(self, inputs)
+        self.name = "Add_Op"
+
+    preallocates = True
+
+    def infer_shape(self):
+        return _broadcast_spec(self)
+
+    def forward(self):
+        """
+        Sums the inputs into one output array.
+        """
+        self.value = _reduce(np.add, [n.value for n in self.inbound_nodes], self._output())
+
+    def backward(self):
+        """
+        The partial with respect to each input is the upstream gradient,
+        summed over the axes the input was broadcast along.
+        """
+        grad_cost = self._outbound_gradient()
+        counts = {}
+        for n in self.inbound_nodes:
+            counts[n] = counts.get(n, 0) + 1
+
+        for n, count in counts.items():
+            shape = np.shape(n.value)
+            if count == 1 and np.shape(grad_cost) == shape:
+                # Read only, like every gradient, so it can be passed on as is.
+                self.gradients[n] = grad_cost
+                continue
+            grad = self._gradient_buffer(n, shape, np.result_type(grad_cost, n.value))
+            _sum_to(grad_cost, grad)
+            if count > 1:
+                # An input added several times gets the gradient that many times.
+                np.multiply(grad, count, out=grad)
+            self.gradients[n] = grad
+
+
+class Mul(Node):
+    """
+    Multiplies any number of inputs elementwise, with NumPy broadcasting.
+    """
+    def __init__(self, *inputs):
+        Node.__init__(self, inputs)
+        self.name = "Mul_Op"
+
+    preallocates = True
+
+    def infer_shape(self):
+        return _broadcast_spec(self)
+
+    def forward(self):
+        """
+        Multiplies the inputs into one output array.
+        """
+        self.value = _reduce(np.multiply, [n.value for n in self.inbound_nodes], self._output())
+
+    def backward(self):
+        """
+        The partial with respect to input i is the upstream gradient times
+        the product of all the other inputs (product rule). It is built from
+        running products of the inputs before and after i, so nothing is
+        divided by an input and zeros are handled exactly.
+        """
+        grad_cost = self._outbound_gradient()
+        inputs = self.inbound_nodes
+        values = [n.value for n in inputs]
+        shapes = [np.shape(v) for v in values]
+        dtype = np.result_type(grad_cost, *values)
+        full = np.broadcast_shapes(np.shape(grad_cost), *shapes)
+
+        # suffixes[i]: product of the inputs after i (None for the last one)
+        suffixes = [None] * len(values)
+        for i in range(len(values) - 2, -1, -1):
+            after = suffixes[i + 1]
+            if after is None:
+                suffixes[i] = values[i + 1]
+            else:
+                suffixes[i] = self._buffer(('suffix', i),
+                                           np.broadcast_shapes(shapes[i + 1], np.shape(after)), dtype)
+                np.multiply(values[i + 1], after, out=suffixes[i])
+
+        prefix = None
+        done = set()
+        for i, n in enumerate(inputs):
+            # grad_cost * prefix * suffix, in the gradient buffer when it
+            # has the full shape, otherwise in scratch space to be summed.
+            if shapes[i] == full and n not in done:
+                partial = self._gradient_buffer(n, full, dtype)
+            else:
+                partial = self._buffer('scratch', full, dtype)
+            if suffixes[i] is None:
+                np.copyto(partial, grad_cost)
+            else:
+                np.multiply(grad_cost, suffixes[i], out=partial)
+            if prefix is not None:
+                np.multiply(partial, prefix, out=partial)
+
+            if n in done:
+                # The same input used again: add this term to its gradient.
+                grad = self.gradients[n]
+                term = self._buffer('term', shapes[i], dtype)
+                _sum_to(partial, term)
+                np.add(grad, term, out=grad)
+            elif partial.shape != shapes[i]:
+                grad = self._gradient_buffer(n, shapes[i], dtype)
+                _sum_to(partial, grad)
+                self.gradients[n] = grad
+            else:
+                self.gradients[n] = partial
+            done.add(n)
+
+            if i < len(values) - 1:
+                if prefix is None:
+                    prefix = values[i]
+                else:
+                    before = self._buffer(('prefix', i), np.broadcast_shapes(np.shape(prefix), shapes[i]), dtype)
+                    np.multiply(prefix, values[i], out=before)
+                    prefix = before
+
+
+def _reduce(ufunc, values, out=None):
+    """
+    Combines `values` with `ufunc` (np.add or np.multiply) into a single new
+    array of their broadcast shape (or into `out`), accumulating in place.
+    """
+    if out is not None:
+        if len(values) == 1:
+            np.copyto(out, values[0])
+        else:
+            ufunc(values[0], values[1], out=out)
+        for v in values[2:]:
+            ufunc(out, v, out=out)
+        return out
+
+    if len(values) == 1:
+        out = np.array(values[0])
+    else:
+        out = np.asarray(ufunc(values[0], values[1]))
+        shape = np.broadcast_shapes(*[np.shape(v) for v in values[2:]], out.shape)
+        if out.shape != shape:
+            out = np.broadcast_to(out, shape).copy()
+        dtype = np.result_type(out, *values[2:])
+        if dtype != out.dtype:
+            out = out.astype(dtype)
+        for v in values[2:]:
+            ufunc(out, v, out=out)
+    # Scalars in, scalar out.
+    return out if out.ndim else out[()]
+
+
+def _broadcast_spec(node):
+    """
+    The (shape, dtype) of combining the inbound values of `node` elementwise.
+    """
+    specs = node._inbound_specs()
+    if specs is None:
+        return None
+    try:
+        shape = np.broadcast_shapes(*[shape for shape, _ in specs])
+    except ValueError:
+        raise ValueError("{}: input shapes {} can't be broadcast together".format(
+            node.name, [shape for shape, _ in specs]))
+    return shape, np.result_type(*[dtype for _, dtype in specs])
+
+
+def _linear_spec(node):
+    """
+    The (shape, dtype) of X . W + b for the inbound nodes (X, W, b) of `node`,
+    following `np.dot` for 1-D and 2-D X and W. None (unknown) for the
+    shapes it doesn't model: other numbers of dimensions, or a bias that
+    broadcasts the product to a larger shape.
+    """
+    specs = node._inbound_specs()
+    if specs is None:
+        return None
+    (x_shape, x_dtype), (w_shape, w_dtype), (b_shape, b_dtype) = specs
+    if len(x_shape) not in (1, 2) or len(w_shape) not in (1, 2):
+        return None
+    if x_shape[-1] != w_shape[0]:
+        raise ValueError("{}: can't multiply X of shape {} by W of shape {}".format(
+            node.name, x_shape, w_shape))
+    # np.dot drops the contracted axis of each operand.
+    shape = x_shape[:-1] + w_shape[1:]
+    try:
+        if np.broadcast_shapes(shape, b_shape) != shape:
+            return None
+    except ValueError:
+        raise ValueError("{}: bias of shape {} doesn't fit the output of shape {}".format(
+            node.name, b_shape, shape))
+    return shape, np.result_type(x_dtype, w_dtype, b_dtype)
+
+
+def _sum_to(grad, out):
+    """
+    Sums `grad` over the axes it was broadcast along to get `out`'s shape,
+    writing into `out`.
+    """
+    shape = out.shape
+    lead = np.ndim(grad) - len(shape)
+    if lead < 0:
+        # The gradient is smaller than the input (e.g. the scalar 0 of an output node).
+        np.copyto(out, grad)
+        return
+    axes = tuple(range(lead)) + tuple(lead + i for i, size in enumerate(shape)
+                                     if size == 1 and np.shape(grad)[lead + i] != 1)
+    np.sum(grad, axis=axes, keepdims=True, out=out.reshape((1,) * lead + shape))
+
+
+class Linear(Node):
+    """
+    Represents a node that performs a linear transform.
+    """
+    def __init__(self, X, W, b):
+        # The base class (Node) constructor. Weights and bias
+        # are treated like inbound nodes.
+        Node.__init__(self, [X, W, b])
+        self.name = "Linear_OP"
+
+    preallocates = True
+
+    def infer_shape(self):
+        return _linear_spec(self)
+
+    def forward(self):
+        """
+        Performs the math behind a linear transform.
+        """
+        self.X = self.inbound_nodes[0]
+        self.W = self.inbound_nodes[1]
+        self.b = self.inbound_nodes[2]
+
+        out = self._output()
+        if out is None:
+            self.value = np.dot(self.X.value,self.W.value) + self.b.value
+        else:
+            # Straight into the preallocated array, bias added in place.
+            np.matmul(self.X.value, self.W.value, out=out)
+            out += self.b.value
+            self.value = out
+
+    def backward(self):
+        """
+        Calculates the gradient based on the output values.
+        """
+        # Get the partial of the cost with respect to this node.
+        # The out is mostly only one node, a activation function!(sigmoid here).
+        # With more outputs the partials are summed first: every term below is
+        # linear in grad_cost, so this gives the same result with one matmul each.
+        grad_cost = self._outbound_gradient()
+        X, W, b = self.X.value, self.W.value, self.b.value
+
+        # The partials are written straight into buffers that are kept
+        # between steps, so no arrays are allocated here.
+        dtype = np.result_type(grad_cost, X, W)
+        grad_X = self._gradient_buffer(self.X, np.shape(X), dtype)
+        grad_W = self._gradient_buffer(self.W, np.shape(W), dtype)
+        grad_b = self._gradient_buffer(self.b, np.shape(b), dtype)
+
+        if not self.outbound_nodes:
+            # Nothing uses this node, so the cost doesn't depend on it.
+            for grad in (grad_X, grad_W, grad_b):
+                grad.fill(0)
+        else:
+            # Set the partial of the loss with respect to this node's inputs.
+            np.matmul(grad_cost, W.T, out=grad_X)
+            # Set the partial of the loss with respect to this node's weights.
+            np.matmul(X.T, grad_cost, out=grad_W)
+            # Set the partial of the loss with respect to this node's bias,
+            # summed over the rows (and any other axes it was broadcast along).
+            _sum_to(grad_cost, grad_b)
+
+        self.gradients[self.X] = grad_X
+        self.gradients[self.W] = grad_W
+        self.gradients[self.b] = grad_b
+
+
+class Sigmoid(Node):
+    """
+    Represents a node that performs the sigmoid activation function.
+    """
+    def __init__(self, node):
+        # The base class constructor.
+        Node.__init__(self, [node])
+        self.name = "Sigmoid_Op"
+
+    preallocates = True
+
+    def infer_shape(self):
+        specs = self._inbound_specs()
+        if specs is None:
+            return None
+        shape, dtype = specs[0]
+        # exp promotes integers to floats
+        return shape, np.result_type(dtype, np.float16)
+
+    def _sigmoid(self, x):
+        """
+        This method is separate from `forward` because it
+        will be used with `backward` as well.
+
+        `x`: A numpy array-like object.
+        """
+        return 1. / (1. + np.exp(-x))
+
+    def forward(self):
+        """
+        Perform the sigmoid function and set the value.
+        """
+        input_value = self.inbound_nodes[0].value
+        out = self._output()
+        if out is None:
+            self.value = self._sigmoid(input_value)
+        else:
+            # 1 / (1 + exp(-x)), one step at a time in the preallocated array
+            np.negative(input_value, out=out)
+            np.exp(out, out=out)
+            out += 1.
+            np.reciprocal(out, out=out)
+            self.value = out
+
+    def backward(self):
+        """
+        Calculates the gradient using the derivative of
+        the sigmoid function.
+        """
+        # Get the partial of the cost with respect to this node,
+        # summed over all outputs. For eg. get it from MSE
+        grad_cost = self._outbound_gradient()
+        sigmoid = self.value
+        node = self.inbound_nodes[0]
+
+        # sigmoid * (1 - sigmoid) * grad_cost, computed in place in a buffer
+        # kept between steps.
+        grad = self._gradient_buffer(node, np.shape(node.value), np.result_type(sigmoid, grad_cost))
+        np.subtract(1, sigmoid, out=grad)
+        np.multiply(grad, sigmoid, out=grad)
+        np.multiply(grad, grad_cost, out=grad)
+        self.gradients[node] = grad
+
+
+class Dense(Node):
+    """
+    A fully connected layer: `Linear` followed by `Sigmoid` in a single node.
+
+    Same result as `Sigmoid(Linear(X, W, b))`, but the sigmoid is applied in
+    place on the matmul output and, in backward, its derivative is applied in
+    place before the matmuls, so no separate pre-activation or sigmoid arrays
+    are materialized.
+    """
+    def __init__(self, X, W, b):
+        Node.__init__(self, [X, W, b])
+        self.name = "Dense_Op"
+
+    preallocates = True
+
+    def infer_shape(self):
+        spec = _linear_spec(self)
+        if spec is None:
+            return None
+        return spec[0], np.result_type(spec[1], np.float16)
+
+    def forward(self):
+        """
+        Computes sigmoid(X . W + b) in the matmul output.
+        """
+        self.X = self.inbound_nodes[0]
+        self.W = self.inbound_nodes[1]
+        self.b = self.inbound_nodes[2]
+
+        X, W, b = self.X.value, self.W.value, self.b.value
+        out = self._output()
+        if out is None:
+            # Allocated as floats, so integer inputs can be worked on in place.
+            out = np.matmul(X, W, dtype=np.result_type(X, W, b, np.float16))
+        else:
+            np.matmul(X, W, out=out)
+        out += b
+        # 1 / (1 + exp(-out)), one step at a time in the same array
+        np.negative(out, out=out)
+        np.exp(out, out=out)
+        out += 1.
+        np.reciprocal(out, out=out)
+        self.value = out
+
+    def backward(self):
+        """
+        Calculates the gradients of the pre-activation first, then the
+        partials of the inputs, weights and bias from it.
+        """
+        grad_cost = self._outbound_gradient()
+        X, W, b = self.X.value, self.W.value, self.b.value
+        sigmoid = self.value
+        dtype = np.result_type(grad_cost, X, W, sigmoid)
+
+        # Partial of the cost with respect to the pre-activation:
+        # sigmoid * (1 - sigmoid) * grad_cost
+        delta = self._buffer('delta', sigmoid.shape, dtype)
+        np.subtract(1, sigmoid, out=delta)
+        np.multiply(delta, sigmoid, out=delta)
+        np.multiply(delta, grad_cost, out=delta)
+
+        grad_X = self._gradient_buffer(self.X, np.shape(X), dtype)
+        grad_W = self._gradient_buffer(self.W, np.shape(W), dtype)
+        grad_b = self._gradient_buffer(self.b, np.shape(b), dtype)
+        np.matmul(delta, W.T, out=grad_X)
+        np.matmul(X.T, delta, out=grad_W)
+        _sum_to(delta, grad_b)
+
+        self.gradients[self.X] = grad_X
+        self.gradients[self.W] = grad_W
+        self.gradients[self.b] = grad_b
+
+
+class MSE(Node):
+    def __init__(self, y, a):
+        """
+        The mean squared error cost function.
+        Should be used as the last node for a network.
+        """
+        # Call the base class' constructor.
+        Node.__init__(self, [y, a])
+        self.name = "MSE_Op"
+
+    def infer_shape(self):
+        specs = self._inbound_specs()
+        if specs is None:
+            return None
+        (y_shape, y_dtype), (a_shape, a_dtype) = specs
+        # Both are flattened to columns, so they must have as many elements.
+        if int(np.prod(y_shape)) != int(np.prod(a_shape)):
+            raise ValueError("{}: y of shape {} doesn't match a of shape {}".format(
+                self.name, y_shape, a_shape))
+        return (), np.dtype(_loss_dtype() or np.result_type(y_dtype, a_dtype, np.float16))
+
+
+    def forward(self):
+        """
+        Calculates the mean squared error.
+        """
+        # NOTE: We reshape these to avoid possible matrix/vector broadcast
+        # errors.
+        #
+        # For example, if we subtract an array of shape (3,) from an array of shape
+        # (3,1) we get an array of shape(3,3) as the result when we want
+        # an array of shape (3,1) instead.
+        #
+        # Making both arrays (3,1) insures the result is (3,1) and does
+        # an elementwise subtraction as expected.
+        y = self.inbound_nodes[0].value.reshape(-1, 1)
+        a = self.inbound_nodes[1].value.reshape(-1, 1)
+
+        diff = y - a
+        # Accumulate in the policy's loss dtype (e.g. float64 on float32 values).
+        self.value = np.mean(np.square(diff), dtype=_loss_dtype())
+
+        # Save the computed output for backward.
+        if _grad_enabled.get():
+            self.m = self.inbound_nodes[0].value.shape[0]
+            self.diff = diff
+        else:
+            self.diff = None
+
+    def backward(self):
+        """
+        Calculates the gradient of the cost.
+
+        This is the final node of the network so outbound nodes
+        are not a concern.
+        """
+        y, a = self.inbound_nodes
+        grad_y = self._gradient_buffer(y, self.diff.shape, self.diff.dtype)
+        grad_a = self._gradient_buffer(a, self.diff.shape, self.diff.dtype)
+        np.multiply(self.diff, 2 / self.m, out=grad_y)
+        np.multiply(self.diff, -2 / self.m, out=grad_a) #for eg. this goes back to Sigmoid
+        self.gradients[y] = grad_y
+        self.gradients[a] = grad_a
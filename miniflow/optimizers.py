@@ -0,0 +1,186 @@
+"""
+Optimizers that update the trainable `Input` nodes from their gradients.
+"""
+import numpy as np
+
+
+def sgd_update(trainables, learning_rate=1e-2):
+    """
+    Updates the value of each trainable with SGD.
+
+    Arguments:
+
+        `trainables`: A list of `Input` Nodes representing weights/biases.
+        `learning_rate`: The learning rate.
+    """
+    # Performs SGD
+    #
+    # Loop over the trainables
+    for t in trainables:
+        # Change the trainable's value by subtracting the learning rate
+        # multiplied by the partial of the cost with respect to this
+        # trainable.
+        partial = t.gradients[t]
+        t.value -= learning_rate * partial
+
+
+class Optimizer(object):
+    """
+    Base class for optimizers that keep state between steps.
+
+    The state (moments, scratch space) is allocated once per trainable on
+    the first step and updated in place afterwards, so a step allocates no
+    arrays. An optimizer can be called like `sgd_update`, i.e. `opt(trainables)`.
+
+    Arguments:
+
+        `learning_rate`: The learning rate.
+    """
+    def __init__(self, learning_rate=1e-2):
+        self.learning_rate = learning_rate
+        self.state = {}
+
+    def __call__(self, trainables):
+        self.update(trainables)
+
+    def _slots(self, t, count):
+        """
+        Returns `count` zero-initialized arrays shaped like `t.value`,
+        kept for `t` between steps.
+        """
+        slots = self.state.get(t)
+        value = t.value
+        if slots is None or slots[0].shape != value.shape or slots[0].dtype != value.dtype:
+            slots = self.state[t] = [np.zeros_like(value) for _ in range(count)]
+        return slots
+
+    def update(self, trainables):
+        """
+        Updates the value of each trainable in place from `t.gradients[t]`,
+        then calls `t.mark_dirty()`.
+
+        `trainables`: A list of `Input` Nodes representing weights/biases.
+        """
+        raise NotImplementedError
+
+
+class SGD(Optimizer):
+    """
+    Plain stochastic gradient descent, as `sgd_update` but without a
+    temporary array per trainable.
+    """
+    def update(self, trainables):
+        for t in trainables:
+            scratch, = self._slots(t, 1)
+            np.multiply(t.gradients[t], self.learning_rate, out=scratch)
+            np.subtract(t.value, scratch, out=t.value)
+            t.mark_dirty()
+
+
+class Momentum(Optimizer):
+    """
+    SGD with momentum: v = momentum * v - learning_rate * grad; value += v
+
+    Arguments:
+
+        `learning_rate`: The learning rate.
+        `momentum`: How much of the previous step is kept.
+    """
+    def __init__(self, learning_rate=1e-2, momentum=0.9):
+        Optimizer.__init__(self, learning_rate)
+        self.momentum = momentum
+
+    def update(self, trainables):
+        for t in trainables:
+            velocity, scratch = self._slots(t, 2)
+            np.multiply(t.gradients[t], self.learning_rate, out=scratch)
+            np.multiply(velocity, self.momentum, out=velocity)
+            np.subtract(velocity, scratch, out=velocity)
+            np.add(t.value, velocity, out=t.value)
+            t.mark_dirty()
+
+
+class RMSProp(Optimizer):
+    """
+    RMSProp: scales each step by a running average of the squared gradients.
+
+        s = decay * s + (1 - decay) * grad^2
+        value -= learning_rate * grad / (sqrt(s) + epsilon)
+
+    Arguments:
+
+        `learning_rate`: The learning rate.
+        `decay`: Decay rate of the running average.
+        `epsilon`: Added to the denominator for numerical stability.
+    """
+    def __init__(self, learning_rate=1e-3, decay=0.9, epsilon=1e-8):
+        Optimizer.__init__(self, learning_rate)
+        self.decay = decay
+        self.epsilon = epsilon
+
+    def update(self, trainables):
+        for t in trainables:
+            grad = t.gradients[t]
+            square_avg, scratch = self._slots(t, 2)
+            np.multiply(grad, grad, out=scratch)
+            np.multiply(scratch, 1 - self.decay, out=scratch)
+            np.multiply(square_avg, self.decay, out=square_avg)
+            np.add(square_avg, scratch, out=square_avg)
+
+            np.sqrt(square_avg, out=scratch)
+            np.add(scratch, self.epsilon, out=scratch)
+            np.divide(grad, scratch, out=scratch)
+            np.multiply(scratch, self.learning_rate, out=scratch)
+            np.subtract(t.value, scratch, out=t.value)
+            t.mark_dirty()
+
+
+class Adam(Optimizer):
+    """
+    Adam: running averages of the gradients and of their squares, with
+    bias correction for the first steps.
+
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad^2
+        value -= learning_rate * m_hat / (sqrt(v_hat) + epsilon)
+
+    where m_hat = m / (1 - beta1^step) and v_hat = v / (1 - beta2^step).
+
+    Arguments:
+
+        `learning_rate`: The learning rate.
+        `beta1`, `beta2`: Decay rates of the two running averages.
+        `epsilon`: Added to the denominator for numerical stability.
+    """
+    def __init__(self, learning_rate=1e-3, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        Optimizer.__init__(self, learning_rate)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.step = 0
+
+    def update(self, trainables):
+        self.step += 1
+        # Bias corrections are scalars, folded into the in-place operations below.
+        mean_correction = self.learning_rate / (1 - self.beta1 ** self.step)
+        var_correction = (1 - self.beta2 ** self.step) ** 0.5
+
+        for t in trainables:
+            grad = t.gradients[t]
+            mean, var, scratch = self._slots(t, 3)
+            np.multiply(mean, self.beta1, out=mean)
+            np.multiply(grad, 1 - self.beta1, out=scratch)
+            np.add(mean, scratch, out=mean)
+
+            np.multiply(grad, grad, out=scratch)
+            np.multiply(scratch, 1 - self.beta2, out=scratch)
+            np.multiply(var, self.beta2, out=var)
+            np.add(var, scratch, out=var)
+
+            np.sqrt(var, out=scratch)
+            np.divide(scratch, var_correction, out=scratch)
+            np.add(scratch, self.epsilon, out=scratch)
+            np.divide(mean, scratch, out=scratch)
+            np.multiply(scratch, mean_correction, out=scratch)
+            np.subtract(t.value, scratch, out=t.value)
+            t.mark_dirty()
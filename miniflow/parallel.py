@@ -0,0 +1,297 @@
+"""
+Data-parallel training across CPU cores.
+
+Each worker process holds a replica of the graph. Every step the batch is
+split into one shard per worker, each worker runs forward and backward on
+its shard and writes its gradients into shared memory, and the parent sums
+them and applies a single update to the trainables. The trainables live in
+shared memory too, so the workers see the update without any copying.
+"""
+import multiprocessing
+import traceback
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from miniflow.graph import Graph
+from miniflow.optimizers import sgd_update
+
+
+def _attach(name):
+    """
+    Attaches to an existing shared memory block without taking ownership of it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block with the resource tracker.
+        # Worker processes share the parent's tracker, where the block is
+        # already registered, so this is harmless.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _close(blocks):
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # Still viewed by an array somewhere; the mapping goes away with it.
+            pass
+
+
+def _views(buf, layout):
+    """
+    Returns one array per (offset, shape) in `layout`, viewing the flat array `buf`.
+    """
+    return [buf[offset:offset + int(np.prod(shape))].reshape(shape) for offset, shape in layout]
+
+
+def _worker(index, conn, inputs, cost, trainables, dtype_policy, param_spec, grad_spec):
+    """
+    Runs in each worker process: answers 'inputs', 'step' and 'close' messages.
+    """
+    blocks = []
+    try:
+        layout, dtype, params_name = param_spec
+        params_shm = _attach(params_name)
+        grads_shm = _attach(grad_spec[0])
+        blocks += [params_shm, grads_shm]
+        total = sum(int(np.prod(shape)) for _, shape in layout)
+        params = np.ndarray((total,), dtype=dtype, buffer=params_shm.buf)
+        grads = np.ndarray((grad_spec[1], total), dtype=dtype, buffer=grads_shm.buf)[index]
+
+        # The trainables read their values straight from shared memory.
+        for t, view in zip(trainables, _views(params, layout)):
+            t.value = view
+        grad_views = _views(grads, layout)
+
+        graph = Graph(list(inputs) + list(trainables), dtype_policy=dtype_policy)
+        batch = []
+        conn.send(('ready',))
+
+        while True:
+            message = conn.recv()
+            if message[0] == 'close':
+                break
+            if message[0] == 'inputs':
+                # The parent (re)allocated the batch buffers; drop the old views first.
+                batch = []
+                for n in inputs:
+                    n.value = None
+                _close(blocks[2:])
+                del blocks[2:]
+                for name, shape, batch_dtype in message[1]:
+                    shm = _attach(name)
+                    blocks.append(shm)
+                    batch.append(np.ndarray(shape, dtype=batch_dtype, buffer=shm.buf))
+                continue
+
+            _, start, stop, scale = message
+            graph.feed({n: b[start:stop] for n, b in zip(inputs, batch)})
+            graph.forward_and_backward()
+            # Weight this shard by its share of the batch, so that summing
+            # over workers gives the gradient of the whole batch.
+            for t, out in zip(trainables, grad_views):
+                np.multiply(t.gradients[t], scale, out=out)
+            conn.send(('done', float(cost.value) * scale))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        batch = params = grads = grad_views = None
+        for n in list(inputs) + list(trainables):
+            n.value = None
+        _close(blocks)
+        conn.close()
+
+
+class DataParallelTrainer(object):
+    """
+    Trains a graph with data parallelism over several worker processes.
+
+    Arguments:
+
+        `inputs`: The data `Input` nodes fed with every batch, e.g. `[X, y]`.
+        `cost`: The cost node, whose value is averaged over the batch.
+        `trainables`: The `Input` nodes holding weights/biases. Their values
+            must all have the same dtype; they are moved into shared memory.
+        `num_workers`: Number of worker processes (defaults to the CPU count).
+        `update`: Called as `update(trainables)` after the gradients are summed
+            into `t.gradients[t]`; defaults to `sgd_update` with `learning_rate`.
+        `learning_rate`: The learning rate of the default update.
+        `dtype_policy`: The `DTypePolicy` of the worker graphs.
+
+    Use it as a context manager (or call `close()`) to stop the workers and
+    free the shared memory.
+    """
+    def __init__(self, inputs, cost, trainables, num_workers=None, update=None,
+                 learning_rate=1e-2, dtype_policy=None):
+        self.inputs = list(inputs)
+        self.cost = cost
+        self.trainables = list(trainables)
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.update = update or partial(sgd_update, learning_rate=learning_rate)
+        self.dtype_policy = dtype_policy
+
+        values = [np.asarray(t.value) for t in self.trainables]
+        if dtype_policy is not None:
+            dtype = dtype_policy.compute
+        else:
+            dtype = values[0].dtype
+            if any(v.dtype != dtype for v in values):
+                raise ValueError("All trainables must have the same dtype, got {}".format(
+                    [v.dtype for v in values]))
+        layout = []
+        offset = 0
+        for v in values:
+            layout.append((offset, v.shape))
+            offset += v.size
+
+        self._blocks = []
+        self._batch_blocks = []
+        self._batches = []
+        self._workers = []
+        self._conns = []
+
+        # Parameters: one flat shared array that the trainables become views of.
+        params_shm = self._allocate(max(offset, 1) * dtype.itemsize)
+        params = np.ndarray((offset,), dtype=dtype, buffer=params_shm.buf)
+        for t, v, view in zip(self.trainables, values, _views(params, layout)):
+            view[...] = v
+            t.value = view
+
+        # Gradients: one row per worker, summed into `reduced` by the parent.
+        grads_shm = self._allocate(max(offset, 1) * dtype.itemsize * self.num_workers)
+        self._worker_grads = np.ndarray((self.num_workers, offset), dtype=dtype, buffer=grads_shm.buf)
+        self._reduced = np.zeros(offset, dtype=dtype)
+        self._reduced_views = _views(self._reduced, layout)
+
+        # Data values are sent through shared memory, not pickled with the graph.
+        saved = [n.value for n in self.inputs]
+        for n in self.inputs:
+            n.value = None
+        try:
+            for index in range(self.num_workers):
+                parent_conn, child_conn = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_worker, name="miniflow-worker-{}".format(index), daemon=True,
+                    args=(index, child_conn, self.inputs, self.cost, self.trainables, dtype_policy,
+                          (layout, dtype, params_shm.name), (grads_shm.name, self.num_workers)))
+                process.start()
+                child_conn.close()
+                self._workers.append(process)
+                self._conns.append(parent_conn)
+        finally:
+            for n, value in zip(self.inputs, saved):
+                n.value = value
+
+        try:
+            for conn in self._conns:
+                self._receive(conn)
+        except BaseException:
+            self.close()
+            raise
+
+    def _allocate(self, size, batch=False):
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        (self._batch_blocks if batch else self._blocks).append(shm)
+        return shm
+
+    def _free(self, blocks):
+        _close(blocks)
+        for shm in blocks:
+            shm.unlink()
+
+    def _receive(self, conn):
+        message = conn.recv()
+        if message[0] == 'error':
+            raise RuntimeError("Worker failed:\n" + message[1])
+        return message
+
+    def _share_batch(self, arrays):
+        """
+        Copies the batch into shared memory, growing the buffers when needed.
+        """
+        arrays = [np.asarray(a) if self.dtype_policy is None else self.dtype_policy.cast(a)
+                  for a in arrays]
+        fits = (len(self._batches) == len(arrays) and
+                all(b.dtype == a.dtype and b.shape[1:] == a.shape[1:] and len(b) >= len(a)
+                    for b, a in zip(self._batches, arrays)))
+        if not fits:
+            self._batches = []
+            self._free(self._batch_blocks)
+            self._batch_blocks = []
+            specs = []
+            for a in arrays:
+                shm = self._allocate(a.nbytes, batch=True)
+                self._batches.append(np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf))
+                specs.append((shm.name, a.shape, a.dtype.str))
+            for conn in self._conns:
+                conn.send(('inputs', specs))
+
+        for b, a in zip(self._batches, arrays):
+            b[:len(a)] = a
+        return len(arrays[0])
+
+    def step(self, *batch):
+        """
+        Runs one training step on a batch (one array per data input, in the
+        order of `inputs`) and returns the cost over the whole batch.
+        """
+        if len(batch) != len(self.inputs):
+            raise ValueError("Expected {} arrays, got {}".format(len(self.inputs), len(batch)))
+        rows = self._share_batch(batch)
+
+        # Split the rows as evenly as possible; workers without rows sit this step out.
+        bounds = np.linspace(0, rows, self.num_workers + 1).astype(int)
+        active = []
+        for index, conn in enumerate(self._conns):
+            start, stop = bounds[index], bounds[index + 1]
+            if stop > start:
+                conn.send(('step', start, stop, (stop - start) / rows))
+                active.append(index)
+
+        loss = 0.
+        for index in active:
+            loss += self._receive(self._conns[index])[1]
+
+        if len(active) == self.num_workers:
+            np.sum(self._worker_grads, axis=0, out=self._reduced)
+        else:
+            np.sum(self._worker_grads[active], axis=0, out=self._reduced)
+        for t, grad in zip(self.trainables, self._reduced_views):
+            t.gradients[t] = grad
+        self.update(self.trainables)
+        return loss
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory. The trainables keep
+        their final values (copied out of shared memory).
+        """
+        for conn in self._conns:
+            try:
+                conn.send(('close',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._workers:
+            process.join()
+        for conn in self._conns:
+            conn.close()
+        self._workers = []
+        self._conns = []
+
+        for t in self.trainables:
+            t.value = np.array(t.value)
+            t.gradients.pop(t, None)
+        self._worker_grads = self._reduced = self._reduced_views = None
+        self._batches = []
+        self._free(self._blocks + self._batch_blocks)
+        self._blocks = []
+        self._batch_blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
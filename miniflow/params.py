@@ -0,0 +1,109 @@
+"""
+Keeping all trainables in one contiguous buffer.
+"""
+import numpy as np
+
+from miniflow.nodes import Input
+
+
+class _FlatInput(Input):
+    """
+    The `Input` holding the flat buffers; in-place updates of it are
+    in-place updates of every trainable.
+    """
+    def __init__(self, trainables):
+        Input.__init__(self, 'flat_parameters')
+        self.trainables = trainables
+
+    def mark_dirty(self):
+        Input.mark_dirty(self)
+        for t in self.trainables:
+            t.mark_dirty()
+
+
+class FlatParameters(object):
+    """
+    Packs the values and gradients of trainable `Input` nodes into two
+    contiguous arrays, `values` and `grads`.
+
+    Each trainable's `value` becomes a view into `values`, and its gradient
+    is written into a view of `grads` by the backward pass. Anything that
+    works on all parameters at once (an optimizer step, the gradient norm,
+    clipping, a checkpoint write) is then one vectorized operation on one
+    array. `node` is an `Input` holding the two flat arrays, so optimizers can
+    update everything in one go, e.g. `Adam()([flat.node])`.
+
+    Values must be updated in place from then on (all optimizers do);
+    assigning a new array to `t.value` detaches it from the flat buffer.
+
+    Arguments:
+
+        `trainables`: A list of `Input` Nodes representing weights/biases.
+        `dtype`: The dtype of the buffers; defaults to that of the values.
+    """
+    def __init__(self, trainables, dtype=None):
+        self.trainables = list(trainables)
+        values = [np.asarray(t.value) for t in self.trainables]
+        if dtype is None:
+            dtype = np.result_type(*values)
+        self.dtype = np.dtype(dtype)
+
+        self.layout = []
+        offset = 0
+        for v in values:
+            self.layout.append((offset, v.shape))
+            offset += v.size
+
+        self.values = np.empty(offset, dtype=self.dtype)
+        self.grads = np.zeros(offset, dtype=self.dtype)
+        for t, v, value_view, grad_view in zip(self.trainables, values,
+                                               self.views(self.values), self.views(self.grads)):
+            value_view[...] = v
+            t.value = value_view
+            t.gradient_slot = grad_view
+            t.gradients[t] = grad_view
+
+        self.node = _FlatInput(self.trainables)
+        self.node.value = self.values
+        self.node.gradients[self.node] = self.grads
+
+    def views(self, flat):
+        """
+        Splits a flat array laid out like `values` into one view per trainable.
+        """
+        return [flat[offset:offset + int(np.prod(shape))].reshape(shape)
+                for offset, shape in self.layout]
+
+    def grad_norm(self):
+        """
+        Returns the global L2 norm of all gradients.
+        """
+        return float(np.sqrt(np.dot(self.grads, self.grads)))
+
+    def clip_by_norm(self, max_norm):
+        """
+        Scales all gradients in place so their global norm is at most `max_norm`.
+
+        Returns the norm before clipping.
+        """
+        norm = self.grad_norm()
+        if norm > max_norm:
+            np.multiply(self.grads, max_norm / norm, out=self.grads)
+        return norm
+
+    def load(self, flat):
+        """
+        Copies `flat` (e.g. a saved `values`) into the parameters.
+        """
+        np.copyto(self.values, flat)
+        self.node.mark_dirty()
+
+    def detach(self):
+        """
+        Gives every trainable its own copy of its value again and stops
+        writing its gradient into the flat buffer.
+        """
+        for t in self.trainables:
+            t.value = np.array(t.value)
+            t.gradient_slot = None
+            t.gradients.pop(t, None)
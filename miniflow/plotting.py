@@ -0,0 +1,14 @@
+"""
+Plotting helpers. matplotlib is only imported when a plot is drawn.
+"""
+
+
+def plot_loss(losses):
+    """
+    Plots the loss per epoch collected during training.
+
+    `losses`: A list with one loss value per epoch.
+    """
+    import matplotlib.pyplot as plot
+
+    return plot.plot(range(len(losses)), losses)
@@ -0,0 +1,143 @@
+"""
+Finding out which nodes a graph run spends its time and memory on.
+"""
+import threading
+import tracemalloc
+
+import numpy as np
+
+from miniflow.nodes import Linear, Dense
+from miniflow.tracers import Tracer
+
+
+def matmul_flops(node, kind):
+    """
+    Estimates the floating point operations of the matrix products in one
+    `forward` or `backward` call of `node`: 2 * N * K * M per product of a
+    (N, K) and a (K, M) matrix. Nodes without matrix products count 0.
+    """
+    if not isinstance(node, (Linear, Dense)):
+        return 0
+    X, W = node.inbound_nodes[0].value, node.inbound_nodes[1].value
+    if X is None or W is None:
+        return 0
+    n, k = np.shape(X)
+    m = np.shape(W)[1]
+    # forward: X . W; backward: grad . W^T and X^T . grad
+    return 2 * n * k * m * (1 if kind == 'forward' else 2)
+
+
+class Profiler(Tracer):
+    """
+    Records the wall time, estimated FLOPs (see `matmul_flops`) and bytes
+    allocated of every `forward` and `backward` call, summed per node over
+    all the steps it is attached for.
+
+    Attach it like any tracer, e.g. `with tracing(Profiler()) as profiler:`,
+    then call `report()`.
+
+    It can be used with a `ThreadedExecutor`, but the bytes are then only
+    approximate: `tracemalloc` has one peak for the whole process, so the
+    bytes of a call running alongside others include what those allocated.
+
+    Arguments:
+
+        `memory`: Measure allocations with `tracemalloc` (started on the first
+            call if it is not running; see `close`). It slows every call down,
+            so turn it off for accurate times.
+    """
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stats = {}
+        # Tells apart nodes with the same name, in the order they first ran.
+        self._numbers = {}
+        self._started_tracemalloc = False
+        # Events may come from several threads at once (see `ThreadedExecutor`):
+        # the memory in use when each call started is kept per thread, and
+        # the rest of the state is only touched under the lock.
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._running = 0
+
+    def on_event(self, event):
+        node = event.node
+        if event.kind.startswith('pre_'):
+            before = 0
+            with self._lock:
+                if self.memory:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        self._started_tracemalloc = True
+                    before = tracemalloc.get_traced_memory()[0]
+                    # Don't reset the peak under a call that is still running.
+                    if not self._running:
+                        tracemalloc.reset_peak()
+                self._running += 1
+            self._starts()[(node, event.kind[len('pre_'):])] = before
+            return
+
+        kind = event.kind[len('post_'):]
+        before = self._starts().pop((node, kind), None)
+        flops = matmul_flops(node, kind)
+        with self._lock:
+            self._running = max(self._running - 1, 0)
+            allocated = 0
+            if self.memory and before is not None and tracemalloc.is_tracing():
+                allocated = max(tracemalloc.get_traced_memory()[1] - before, 0)
+
+            stats = self.stats.get((node, kind))
+            if stats is None:
+                stats = self.stats[(node, kind)] = {
+                    'node': node, 'kind': kind,
+                    'number': self._numbers.setdefault(node, len(self._numbers)),
+                    'calls': 0, 'seconds': 0., 'flops': 0, 'bytes': 0}
+            stats['calls'] += 1
+            stats['seconds'] += event.elapsed
+            stats['flops'] += flops
+            stats['bytes'] += allocated
+
+    def _starts(self):
+        # The memory in use when each call running on this thread started.
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = {}
+        return starts
+
+    def report(self, sort_by='seconds', limit=None):
+        """
+        Returns a table of the recorded calls, one row per node and kind,
+        sorted by `sort_by` ('seconds', 'flops', 'bytes' or 'calls'), largest first.
+
+        `bytes` is the peak of what a call allocated on top of what was
+        already allocated when it started.
+        """
+        with self._lock:
+            stats = list(self.stats.values())
+        rows = sorted(stats, key=lambda s: s[sort_by], reverse=True)[:limit]
+        total = sum(s['seconds'] for s in stats) or 1.
+        lines = ['{:<24} {:<8} {:>6} {:>11} {:>6} {:>11} {:>9} {:>11}'.format(
+            'node', 'kind', 'calls', 'total ms', '%', 'per call us', 'GFLOP/s', 'KiB/call')]
+        for s in rows:
+            lines.append('{:<24} {:<8} {:>6} {:>11.3f} {:>6.1f} {:>11.1f} {:>9.2f} {:>11.1f}'.format(
+                '{}#{}'.format(s['node'].name, s['number']), s['kind'], s['calls'],
+                s['seconds'] * 1e3, 100. * s['seconds'] / total,
+                s['seconds'] / s['calls'] * 1e6,
+                s['flops'] / s['seconds'] / 1e9 if s['seconds'] else 0.,
+                s['bytes'] / s['calls'] / 1024.))
+        return '\n'.join(lines)
+
+    def reset(self):
+        """
+        Forgets everything recorded so far.
+        """
+        with self._lock:
+            self.stats = {}
+            self._numbers = {}
+
+    def close(self):
+        """
+        Stops `tracemalloc` if this profiler started it.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
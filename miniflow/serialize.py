@@ -0,0 +1,122 @@
+"""
+Saving a graph's structure to disk and loading it back ready to run.
+
+A saved graph is a directory holding `graph.json` and, for the values of
+the parameters and constant inputs, a checkpoint (see `miniflow.checkpoint`).
+`graph.json` lists the nodes in topological order, each with its kind, its
+name and the positions of its inbound nodes in that list, so loading only
+creates the nodes and reuses the saved order instead of sorting again.
+"""
+import json
+import os
+from collections import namedtuple
+
+from miniflow import nodes
+from miniflow.checkpoint import _write, load_checkpoint
+from miniflow.graph import Graph, sort_ancestors
+from miniflow.nodes import Input, Add, Mul, Linear, Sigmoid, Dense, MSE
+
+GRAPH = 'graph.json'
+FORMAT_VERSION = 1
+
+# The node classes a graph can be made of, by name.
+KINDS = {cls.__name__: cls for cls in (Input, Add, Mul, Linear, Sigmoid, Dense, MSE)}
+
+LoadedGraph = namedtuple('LoadedGraph', ['graph', 'nodes', 'inputs', 'parameters', 'outputs'])
+LoadedGraph.__doc__ = """
+What `load_graph` returns.
+
+    `graph`: A `Graph` over all the nodes, already compiled.
+    `nodes`: All the nodes, in topological order.
+    `inputs`: The data `Input` nodes (neither parameters nor constants), to be fed.
+    `parameters`: The parameter `Input` nodes, in the order they were given, with their values.
+    `outputs`: The output nodes, in the order they were given.
+"""
+
+
+def save_graph(path, output_nodes, parameters=(), kinds=None):
+    """
+    Saves the graph `output_nodes` depend on to the directory `path`.
+
+    Arguments:
+
+        `path`: The directory to write (created if needed).
+        `output_nodes`: A node or a list of nodes whose values are needed.
+        `parameters`: The `Input` nodes whose values are saved with the graph,
+            e.g. the trainables. Constant inputs are always saved.
+        `kinds`: Extra node classes by name, for graphs with custom nodes.
+            Their constructors must take the inbound nodes as arguments.
+    """
+    kinds = dict(KINDS, **(kinds or {}))
+    outputs = [output_nodes] if isinstance(output_nodes, nodes.Node) else list(output_nodes)
+    sorted_nodes = sort_ancestors(outputs)
+    position = {n: i for i, n in enumerate(sorted_nodes)}
+
+    entries = []
+    for n in sorted_nodes:
+        kind = type(n).__name__
+        if kinds.get(kind) is not type(n):
+            raise ValueError("{}: don't know how to save nodes of kind {}".format(n.name, kind))
+        entry = {'kind': kind, 'name': n.name, 'inbound': [position[m] for m in n.inbound_nodes]}
+        if isinstance(n, Input) and n.constant:
+            entry['constant'] = True
+        entries.append(entry)
+
+    missing = [p.name for p in parameters if p not in position]
+    if missing:
+        raise ValueError("Parameters {} are not used by the outputs".format(missing))
+    saved = list(parameters) + [n for n in sorted_nodes
+                                if isinstance(n, Input) and n.constant and n not in set(parameters)]
+    _write(path, [n.name for n in saved], [n.value for n in saved])
+
+    with open(os.path.join(path, GRAPH), 'w') as f:
+        json.dump({
+            'format': FORMAT_VERSION,
+            'nodes': entries,
+            'outputs': [position[n] for n in outputs],
+            'parameters': [position[n] for n in parameters],
+            'values': [position[n] for n in saved],
+        }, f, separators=(',', ':'))
+
+
+def load_graph(path, kinds=None, mmap_mode='c', dtype_policy=None, executor=None):
+    """
+    Loads a graph saved by `save_graph`, with the values of its parameters
+    and constants memory-mapped (see `load_checkpoint` for `mmap_mode`).
+
+    `kinds`, `dtype_policy` and `executor` are as for `save_graph` and `Graph`.
+    With a `dtype_policy` the values are cast to its compute dtype; values
+    saved in another dtype are then read into memory instead of mapped.
+
+    Returns a `LoadedGraph`.
+    """
+    kinds = dict(KINDS, **(kinds or {}))
+    with open(os.path.join(path, GRAPH)) as f:
+        saved = json.load(f)
+    if saved.get('format') != FORMAT_VERSION:
+        raise ValueError("Unsupported graph format: {}".format(saved.get('format')))
+
+    built = []
+    for entry in saved['nodes']:
+        cls = kinds.get(entry['kind'])
+        if cls is None:
+            raise ValueError("Unknown node kind: {}".format(entry['kind']))
+        if cls is Input:
+            n = Input(entry['name'], constant=entry.get('constant', False))
+        else:
+            n = cls(*[built[i] for i in entry['inbound']])
+            n.name = entry['name']
+        built.append(n)
+
+    valued = [built[i] for i in saved['values']]
+    load_checkpoint(path, valued, mmap_mode=mmap_mode)
+    if dtype_policy is not None:
+        for n in valued:
+            n.value = dtype_policy.cast(n.value)
+
+    parameters = [built[i] for i in saved['parameters']]
+    valued = set(valued)
+    inputs = [n for n in built if isinstance(n, Input) and n not in valued]
+    outputs = [built[i] for i in saved['outputs']]
+    graph = Graph.from_sorted(built, dtype_policy, executor, outputs)
+    return LoadedGraph(graph, built, inputs, parameters, outputs)
@@ -0,0 +1,183 @@
+"""
+Serving a trained graph to many concurrent callers with asyncio.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+
+import numpy as np
+
+
+class InferenceServer(object):
+    """
+    Answers single-example requests by running them through the graph in
+    batches.
+
+    Requests are queued; the first one waiting opens a batch, which is run
+    as soon as it has `max_batch_size` rows or `max_latency` seconds after
+    that request arrived, whichever comes first. The batch runs through
+    `Graph.infer` on a worker thread (so the event loop keeps accepting
+    requests), and row i of the output goes back to the i-th caller.
+
+    Arguments:
+
+        `graph`: The `Graph` to run.
+        `inputs`: The `Input` node (or list of nodes) a request gives one row for.
+        `output`: The node whose value is returned, one row per request.
+        `max_batch_size`: The most requests run together.
+        `max_latency`: How long (in seconds) the first request of a batch may
+            wait for others to join it.
+
+    Use it as an async context manager (or `await start()` and `stop()`)
+    inside a running event loop.
+    """
+    def __init__(self, graph, inputs, output, max_batch_size=32, max_latency=0.005):
+        self.graph = graph
+        self.inputs = [inputs] if not isinstance(inputs, (list, tuple)) else list(inputs)
+        self.output = output
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue = None
+        self._task = None
+        self._stopping = False
+        # Kept for `stats`: the latest latencies and batch sizes.
+        self._latencies = deque(maxlen=100000)
+        self._batch_sizes = deque(maxlen=100000)
+
+    async def start(self):
+        """
+        Starts batching requests.
+        """
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._serve())
+
+    async def stop(self):
+        """
+        Answers the requests already queued, then stops. Requests made from
+        then on are rejected.
+        """
+        if self._task is None or self._stopping:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def predict(self, *rows):
+        """
+        Returns the output row for one example: one row per input node,
+        shaped like a row of the batches the graph takes (e.g. `X[i]`).
+        """
+        if self._task is None or self._stopping:
+            raise ValueError("The server is not running; call start() first")
+        if len(rows) != len(self.inputs):
+            raise ValueError("Expected {} rows, got {}".format(len(self.inputs), len(rows)))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future, time.perf_counter()))
+        return await future
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = first[2] + self.max_latency
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    request = self._queue.get_nowait()
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            futures = [future for _, future, _ in batch]
+            try:
+                feed = {n: np.stack([rows[i] for rows, _, _ in batch])
+                        for i, n in enumerate(self.inputs)}
+                # In a copy of this task's context, so the run modes set by
+                # `infer` stay on that thread.
+                context = contextvars.copy_context()
+                values = await loop.run_in_executor(None, context.run, self.graph.infer,
+                                                    self.output, feed)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self._batch_sizes.append(len(batch))
+            for (_, future, arrived), value in zip(batch, values):
+                self._latencies.append(now - arrived)
+                if not future.done():
+                    future.set_result(value)
+
+        # Nothing should be left behind the sentinel, but never leave a caller waiting.
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if request is not None and not request[1].done():
+                request[1].set_exception(ValueError("The server was stopped"))
+
+    def stats(self):
+        """
+        Returns the number of requests and batches served, the p50 and p99
+        request latency in milliseconds, and the mean batch fill (batch size
+        over `max_batch_size`).
+        """
+        latencies = np.array(self._latencies) * 1e3
+        sizes = np.array(self._batch_sizes)
+        if not len(sizes):
+            return {'requests': 0, 'batches': 0, 'p50_ms': None, 'p99_ms': None,
+                    'batch_fill': None}
+        return {
+            'requests': len(latencies),
+            'batches': len(sizes),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'batch_fill': float(sizes.mean() / self.max_batch_size),
+        }
+
+
+class LocalClient(object):
+    """
+    Sends requests to an `InferenceServer` in the same process, e.g. to test
+    it or measure its latency under load.
+    """
+    def __init__(self, server):
+        self.server = server
+
+    async def predict(self, *rows):
+        return await self.server.predict(*rows)
+
+    async def map(self, *arrays, concurrency=64):
+        """
+        Sends row i of `arrays` as request i, with at most `concurrency`
+        requests in flight, and returns the outputs stacked in order.
+        """
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with slots:
+                return await self.server.predict(*[a[i] for a in arrays])
+
+        return np.stack(await asyncio.gather(*[one(i) for i in range(len(arrays[0]))]))
@@ -0,0 +1,115 @@
+"""
+Rewriting a graph so that it does less work per step.
+"""
+from miniflow import nodes
+from miniflow.graph import sort_ancestors
+from miniflow.nodes import Input, Add, Mul, no_grad
+
+
+def simplify(output_nodes, fold=True, merge=True, flatten=True):
+    """
+    Rewrites the graph `output_nodes` depend on, in place:
+
+    1. Constant folding: a node computed only from constant `Input`s (see
+       `Input(constant=True)`) is evaluated once and replaced by a constant
+       `Input` holding its value.
+    2. Common-subexpression elimination: nodes of the same type with the
+       same inbound nodes (in the same order) are merged into one.
+    3. Flattening: an `Add` (`Mul`) whose only consumer is another `Add`
+       (`Mul`) is spliced into it, so a chain becomes a single n-ary node.
+
+    Nodes that are folded or merged away are disconnected from their inputs,
+    so they no longer run in any `Graph`. Existing `Graph`s pick up the new
+    structure on their next run.
+
+    Arguments:
+
+        `output_nodes`: A node or a list of nodes whose values are needed.
+        `fold`, `merge`, `flatten`: Enable each rewrite.
+
+    Returns the node(s) computing the outputs, which differ from
+    `output_nodes` where an output was folded or merged.
+    """
+    single = isinstance(output_nodes, nodes.Node)
+    outputs = [output_nodes] if single else list(output_nodes)
+
+    replacements = {}
+    # (type, inbound nodes) -> the node computing it, and the reverse
+    seen = {}
+    keys = {}
+    keep = set(outputs)
+    for n in sort_ancestors(outputs):
+        if isinstance(n, Input):
+            continue
+        if flatten and type(n) in (Add, Mul):
+            for m in _flatten(n, keep):
+                # Spliced nodes no longer compute anything to merge with.
+                seen.pop(keys.pop(m, None), None)
+
+        inbound = n.inbound_nodes
+        if fold and inbound and all(isinstance(m, Input) and m.constant for m in inbound):
+            missing = [m.name for m in inbound if m.value is None]
+            if missing:
+                raise ValueError("Constant inputs {} have no value".format(missing))
+            with no_grad():
+                n.forward()
+            folded = Input(n.name, constant=True)
+            folded.value = n.value
+            replacements[n] = folded
+            _replace(n, folded)
+            continue
+
+        if merge:
+            key = (type(n), tuple(inbound))
+            same = seen.get(key)
+            if same is not None:
+                replacements[n] = same
+                _replace(n, same)
+                continue
+            seen[key] = n
+            keys[n] = key
+
+    outputs = [replacements.get(n, n) for n in outputs]
+    return outputs[0] if single else outputs
+
+
+def _flatten(n, keep):
+    """
+    Splices the inbound nodes of the same type as `n` that feed only `n`
+    (and are not in `keep`) into `n`. Returns the spliced nodes.
+    """
+    spliced = []
+    flat = []
+    for m in n.inbound_nodes:
+        if type(m) is type(n) and m.outbound_nodes == [n] and m not in keep:
+            flat.extend(m.inbound_nodes)
+            spliced.append(m)
+            _rewire(m, [])
+        else:
+            flat.append(m)
+    if spliced:
+        _rewire(n, flat)
+    return spliced
+
+
+def _replace(n, new):
+    """
+    Makes every consumer of `n` use `new` instead, and disconnects `n`.
+    """
+    for c in set(n.outbound_nodes):
+        _rewire(c, [new if m is n else m for m in c.inbound_nodes])
+    _rewire(n, [])
+
+
+def _rewire(n, inbound):
+    """
+    Replaces the inbound nodes of `n`, keeping the outbound lists of the
+    old and new inbound nodes in step.
+    """
+    old = n.inbound_nodes
+    for m in old:
+        m.outbound_nodes.remove(n)
+    n.inbound_nodes = list(inbound)
+    for m in n.inbound_nodes:
+        m.outbound_nodes.append(n)
+    nodes._edges_changed([n] + list(old) + n.inbound_nodes)
@@ -0,0 +1,171 @@
+"""
+Structured tracing of graph runs.
+
+Instead of sprinkling `print` calls through every operation, the loops that
+run the graph report what they do to a *tracer*. When no tracer is attached
+they run the nodes directly, so there is nothing to pay for it.
+"""
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# The tracer currently attached; see `set_tracer`.
+_tracer = None
+
+TraceEvent = namedtuple('TraceEvent', ['kind', 'node', 'shapes', 'dtypes', 'elapsed'])
+TraceEvent.__doc__ = """
+A single tracing event.
+
+    `kind`: One of 'pre_forward', 'post_forward', 'pre_backward', 'post_backward'.
+    `node`: The node being run.
+    `shapes`, `dtypes`: Of the values the node reads (pre_*) or produces (post_*),
+        i.e. inbound values, the node's value, upstream gradients or its gradients.
+    `elapsed`: Seconds spent in the call (post_* only, None otherwise).
+"""
+
+
+class Tracer(object):
+    """
+    Base class for tracers. Override `on_event` to receive `TraceEvent`s.
+    """
+    def on_event(self, event):
+        raise NotImplementedError
+
+
+class TraceRecorder(Tracer):
+    """
+    Keeps every event in `self.events` for inspection after a run.
+    """
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, event):
+        self.events.append(event)
+
+
+class PrintTracer(Tracer):
+    """
+    Prints the values and gradients of each node as the graph runs.
+    Handy to follow the examples below step by step.
+    """
+    def on_event(self, event):
+        node = event.node
+        if event.kind == 'post_forward':
+            print("\n----->Forward pass @ ", node.name)
+            print(node.value)
+        elif event.kind == 'post_backward':
+            print('\n=============================\n\tBP @ {}\n============================='.format(node.name))
+            for n, grad in node.gradients.items():
+                print('W.r.t {}: \n---------------\n{}'.format(n.name, grad))
+
+
+def set_tracer(tracer):
+    """
+    Attaches `tracer` to every graph run (pass None to detach).
+
+    Returns the previously attached tracer.
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+@contextmanager
+def tracing(tracer):
+    """
+    Attaches `tracer` for the duration of a `with` block.
+    """
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+
+
+def _describe(values):
+    shapes = tuple(None if v is None else np.shape(v) for v in values)
+    dtypes = tuple(None if v is None else np.asarray(v).dtype for v in values)
+    return shapes, dtypes
+
+
+def _traced_call(tracer, node, kind):
+    if kind == 'forward':
+        before = [n.value for n in node.inbound_nodes]
+    else:
+        before = [n.gradients.get(node) for n in node.outbound_nodes]
+    tracer.on_event(TraceEvent('pre_' + kind, node, *_describe(before), elapsed=None))
+
+    start = time.perf_counter()
+    getattr(node, kind)()
+    elapsed = time.perf_counter() - start
+
+    after = [node.value] if kind == 'forward' else list(node.gradients.values())
+    tracer.on_event(TraceEvent('post_' + kind, node, *_describe(after), elapsed=elapsed))
+
+
+def run_forward(nodes, releases=None):
+    """
+    Calls `forward()` on each node in order, reporting to the attached tracer.
+
+    `releases`: Optional, one list per node of the nodes whose values are no
+        longer needed once that node has run; their values are dropped then.
+    """
+    tracer = _tracer
+    if releases is None:
+        if tracer is None:
+            for n in nodes:
+                n.forward()
+        else:
+            for n in nodes:
+                _traced_call(tracer, n, 'forward')
+        return
+
+    for n, release in zip(nodes, releases):
+        if tracer is None:
+            n.forward()
+        else:
+            _traced_call(tracer, n, 'forward')
+        for m in release:
+            m.value = None
+
+
+def run_changed(nodes):
+    """
+    Calls `forward()` only on the nodes whose value is missing or whose
+    inbound nodes changed since it was last computed here, reporting to the
+    attached tracer. Every other node keeps its cached value.
+
+    `nodes`: Nodes in topological order.
+    """
+    tracer = _tracer
+    for n in nodes:
+        if not n.inbound_nodes:
+            # Inputs get their values (and versions) from being fed.
+            continue
+        versions = tuple([m.version for m in n.inbound_nodes])
+        if n.value is not None and versions == n._seen_versions:
+            continue
+        if tracer is None:
+            n.forward()
+        else:
+            _traced_call(tracer, n, 'forward')
+        n._seen_versions = versions
+        n.version += 1
+
+
+def run_backward(nodes):
+    """
+    Calls `backward()` on each node in order, reporting to the attached tracer.
+
+    `nodes`: Nodes in reverse topological order.
+    """
+    tracer = _tracer
+    if tracer is None:
+        for n in nodes:
+            n.backward()
+    else:
+        for n in nodes:
+            _traced_call(tracer, n, 'backward')
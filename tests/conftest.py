@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+
+def numerical_gradient(loss, t, eps=1e-6):
+    """
+    The central-difference gradient of `loss()` with respect to the value of
+    the `Input` node `t`, perturbing one element at a time in place.
+    """
+    value = t.value
+    grad = np.zeros_like(value, dtype=np.float64)
+    for i in np.ndindex(value.shape):
+        old = value[i]
+        value[i] = old + eps
+        plus = loss()
+        value[i] = old - eps
+        minus = loss()
+        value[i] = old
+        grad[i] = (plus - minus) / (2 * eps)
+    return grad
+
+
+@pytest.fixture
+def gradcheck():
+    """
+    Checks the gradients `graph.forward_and_backward()` leaves on each of
+    `trainables` against numerical ones of `cost`.
+    """
+    def check(graph, cost, trainables, atol=1e-6):
+        def loss():
+            graph.fetch(cost)
+            return float(cost.value)
+
+        graph.forward_and_backward()
+        analytic = [np.array(t.gradients[t], copy=True) for t in trainables]
+        for t, grad in zip(trainables, analytic):
+            np.testing.assert_allclose(grad, numerical_gradient(loss, t), atol=atol,
+                                       err_msg=t.name)
+    return check
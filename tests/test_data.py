@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from miniflow import DataLoader, Standardize
+
+
+@pytest.mark.parametrize('chunk_size', [None, 7])
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_every_row_once_per_epoch(chunk_size, prefetch, tmp_path):
+    X = np.arange(50 * 3, dtype=float).reshape(50, 3)
+    y = np.arange(50)
+    path = str(tmp_path / 'X.npy')
+    np.save(path, X)
+    loader = DataLoader(path, y, batch_size=8, seed=0, prefetch=prefetch, chunk_size=chunk_size)
+    for _ in range(2):
+        batches = list(loader)
+        assert len(batches) == len(loader) == 7
+        rows = np.concatenate([b[1] for b in batches])
+        assert sorted(rows) == list(range(50))
+        for X_batch, y_batch in batches:
+            np.testing.assert_array_equal(X_batch, X[y_batch])
+
+
+def test_drop_last_and_mismatched_arrays():
+    loader = DataLoader(np.ones((10, 2)), batch_size=4, drop_last=True, prefetch=0)
+    assert [len(b[0]) for b in loader] == [4, 4]
+    with pytest.raises(ValueError):
+        DataLoader(np.ones((10, 2)), np.ones(9))
+
+
+def test_standardize_fit_in_chunks():
+    X = np.random.RandomState(0).randn(1000, 4) * 3 + 2
+    scaler = Standardize.fit(X, chunk_size=64)
+    np.testing.assert_allclose(scaler.mean, X.mean(axis=0))
+    np.testing.assert_allclose(scaler.std, X.std(axis=0))
+    assert scaler(X.astype(np.float32)).dtype == np.float32
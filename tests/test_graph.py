@@ -0,0 +1,232 @@
+import gc
+import threading
+import time
+import weakref
+
+import numpy as np
+import pytest
+
+from miniflow import (Input, Add, Mul, Linear, Sigmoid, MSE, Graph, DTypePolicy, ThreadedExecutor,
+                      no_grad, sort_nodes, topological_sort, forward_pass, simplify)
+
+
+def mlp(depth=4, width=4, rows=8, seed=0):
+    """
+    Returns (feed_dict, cost, trainables) for a small sigmoid MLP.
+    """
+    rng = np.random.RandomState(seed)
+    X, y = Input('X'), Input('y')
+    feed = {X: rng.randn(rows, width), y: rng.randn(rows)}
+    h, trainables = X, []
+    for i in range(depth):
+        W, b = Input('W{}'.format(i)), Input('b{}'.format(i))
+        feed[W], feed[b] = rng.randn(width, width) / 2, rng.randn(width)
+        h = Sigmoid(Linear(h, W, b))
+        trainables += [W, b]
+    W, b = Input('Wo'), Input('bo')
+    feed[W], feed[b] = rng.randn(width, 1), rng.randn(1)
+    trainables += [W, b]
+    return feed, MSE(y, Linear(h, W, b)), trainables
+
+
+def test_sort_nodes_orders_and_validates():
+    x, z = Input('x'), Input('z')
+    a = Add(x, x)
+    b = Mul(a, x)
+    order = sort_nodes([x])
+    assert order.index(x) < order.index(a) < order.index(b)
+
+    Add(b, z)
+    with pytest.raises(ValueError, match='not fed'):
+        sort_nodes([x])
+
+
+def test_nodes_computed_from_constants_alone():
+    x = Input('x')
+    c1, c2 = Input('c1', constant=True), Input('c2', constant=True)
+    c1.value, c2.value = 2., 3.
+    out = Add(x, Mul(c1, c2))
+    graph = Graph({x: 1.})
+    graph.forward_and_backward()
+    assert out.value == 7.
+    assert forward_pass(out, topological_sort({x: 5.})) == 11.
+
+
+def test_sort_stays_linear_with_shortcuts():
+    # Every Add is discovered from x before the chain reaches its link,
+    # which made the search for constant ancestors quadratic.
+    x = Input('x')
+    chain = [x]
+    for _ in range(4000):
+        chain.append(Sigmoid(chain[-1]))
+    for link in chain[:0:-1]:
+        Add(x, link)
+    start = time.perf_counter()
+    assert len(sort_nodes([x])) == 8001
+    assert time.perf_counter() - start < 2.
+
+
+def test_plans_survive_unrelated_nodes_and_follow_new_edges():
+    feed, cost, _ = mlp()
+    graph = Graph(feed)
+    graph.forward_and_backward()
+    state = graph._plan_state
+    Add(Input(), Input())
+    graph.forward_and_backward()
+    assert graph._plan_state is state
+
+    extra = Mul(cost, cost)
+    graph.forward_and_backward()
+    assert extra in graph.sorted_nodes
+
+
+def test_plans_are_freed_with_their_graphs():
+    feed, cost, _ = mlp()
+    X = next(iter(feed))
+    for _ in range(100):
+        Graph(feed).fetch(cost)
+    gc.collect()
+    assert len(X._plans) == 0
+
+    def build():
+        a = Input()
+        out = Sigmoid(a)
+        Graph({a: np.ones(3)}).forward_and_backward()
+        return weakref.ref(out)
+
+    ref = build()
+    gc.collect()
+    assert ref() is None
+
+
+def test_simplify_keeps_results():
+    x = Input('x')
+    c = Input('c', constant=True)
+    c.value = 2.
+    out = Add(Add(Mul(x, c), Mul(x, c)), Add(x, Mul(c, c)))
+    graph = Graph({x: 3.})
+    before = graph.run(out)
+    out = simplify(out)
+    assert graph.run(out) == before
+
+
+def test_fetch_only_runs_what_it_needs():
+    feed, cost, _ = mlp()
+    prediction = cost.inbound_nodes[1]
+    y = cost.inbound_nodes[0]
+    graph = Graph([n for n in feed if n is not y])
+    graph.feed({n: v for n, v in feed.items() if n is not y})
+    assert graph.fetch(prediction).shape == (8, 1)
+    with pytest.raises(ValueError, match='not fed'):
+        graph.fetch(cost)
+
+
+def test_fetch_checks_shapes_before_running():
+    feed, cost, _ = mlp()
+    X = next(iter(feed))
+    graph = Graph(feed)
+    with pytest.raises(ValueError, match="can't multiply"):
+        graph.fetch(cost, {X: np.ones((8, 5))})
+
+
+def test_infer_matches_fetch_and_drops_intermediates():
+    feed, cost, _ = mlp()
+    prediction = cost.inbound_nodes[1]
+    graph = Graph(feed)
+    expected = np.array(graph.fetch(prediction), copy=True)
+    np.testing.assert_allclose(graph.infer(prediction), expected)
+    assert prediction.inbound_nodes[0].value is None
+
+
+def test_incremental_fetch():
+    feed, cost, trainables = mlp()
+    graph = Graph(feed)
+    first = graph.fetch(cost, incremental=True)
+    assert graph.fetch(cost, incremental=True) == first
+    trainables[-1].value = trainables[-1].value + 1.
+    assert graph.fetch(cost, incremental=True) == graph.fetch(cost)
+
+
+@pytest.mark.parametrize('checkpoints', ['sqrt', 'last', []])
+def test_checkpointing_gives_the_same_gradients(checkpoints, gradcheck):
+    feed, cost, trainables = mlp(depth=6)
+    graph = Graph(feed)
+    graph.forward_and_backward()
+    expected = [np.array(t.gradients[t], copy=True) for t in trainables]
+    if checkpoints == 'last':
+        checkpoints = [graph.sorted_nodes[-5]]
+    graph.set_checkpoints(checkpoints)
+    graph.forward_and_backward()
+    for t, grad in zip(trainables, expected):
+        np.testing.assert_allclose(t.gradients[t], grad)
+    gradcheck(graph, cost, trainables[:2])
+
+
+def test_checkpointing_releases_intermediate_gradients():
+    feed, cost, trainables = mlp(depth=16)
+    graph = Graph(feed)
+    graph.set_checkpoints('sqrt')
+    graph.forward_and_backward()
+    for n in graph.sorted_nodes:
+        if isinstance(n, Input):
+            continue
+        assert all(isinstance(key, Input) for key in n.gradients)
+        assert 'value' not in n._buffers
+
+
+def test_dtype_policy_is_per_graph():
+    feed, cost, trainables = mlp()
+    graph = Graph(feed, DTypePolicy(np.float32, loss=np.float64))
+    graph.forward_and_backward()
+    assert trainables[0].gradients[trainables[0]].dtype == np.float32
+    assert cost.value.dtype == np.float64
+
+    # Another graph over the same nodes doesn't change the first one's policy.
+    assert np.asarray(Graph(list(feed)).fetch(cost)).dtype == np.float32
+    graph.forward_and_backward()
+    assert cost.value.dtype == np.float64
+
+
+def test_dtype_policy_casts_values_already_held():
+    rng = np.random.RandomState(0)
+    X, W, b = Input('X'), Input('W'), Input('b')
+    X.value, W.value, b.value = rng.randn(4, 3), rng.randn(3, 2), rng.randn(2)
+    layer = Linear(X, W, b)
+    assert Graph([X, W, b], dtype_policy=DTypePolicy(np.float32)).fetch(layer).dtype == np.float32
+
+
+def test_no_grad_only_applies_to_its_thread():
+    feed_a, cost_a, _ = mlp(seed=0)
+    feed_b, cost_b, _ = mlp(seed=1)
+    training, inference = Graph(feed_a), Graph(feed_b)
+    prediction = cost_b.inbound_nodes[1]
+    stop = threading.Event()
+
+    def infer():
+        while not stop.is_set():
+            inference.infer(prediction)
+
+    thread = threading.Thread(target=infer)
+    thread.start()
+    try:
+        for _ in range(500):
+            training.forward_and_backward()
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_threaded_executor_matches_sequential():
+    feed, cost, trainables = mlp()
+    Graph(feed).forward_and_backward()
+    expected = [np.array(t.gradients[t], copy=True) for t in trainables]
+    with ThreadedExecutor(4) as executor:
+        graph = Graph(feed, executor=executor)
+        graph.forward_and_backward()
+        with no_grad():
+            # The mode reaches the worker threads.
+            graph.fetch(cost)
+        assert cost.diff is None
+        graph.forward_and_backward()
+    for t, grad in zip(trainables, expected):
+        np.testing.assert_allclose(t.gradients[t], grad)
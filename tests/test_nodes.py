@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from miniflow import (Input, Add, Mul, Linear, Sigmoid, Dense, MSE, Graph,
+                      forward_pass, topological_sort)
+
+
+def inputs(*names):
+    return [Input(name) for name in names]
+
+
+def test_add_mul_gradients(gradcheck):
+    rng = np.random.RandomState(0)
+    X, y, W, b, s = inputs('X', 'y', 'W', 'b', 's')
+    h = Linear(X, W, b)
+    # n-ary, broadcast and an input used twice
+    out = Add(Mul(h, s, h), h, Mul(s, s))
+    cost = MSE(y, out)
+    graph = Graph({X: rng.randn(6, 3), y: rng.randn(6), W: rng.randn(3, 1),
+                   b: rng.randn(1), s: rng.randn(1)})
+    gradcheck(graph, cost, [W, b, s])
+
+
+def test_dense_gradients_match_linear_sigmoid(gradcheck):
+    rng = np.random.RandomState(1)
+    X, y, W1, b1, W2, b2 = inputs('X', 'y', 'W1', 'b1', 'W2', 'b2')
+    dense = Dense(X, W1, b1)
+    reference = Sigmoid(Linear(X, W1, b1))
+    cost = MSE(y, Linear(dense, W2, b2))
+    graph = Graph({X: rng.randn(5, 3), y: rng.randn(5), W1: rng.randn(3, 4),
+                   b1: rng.randn(4), W2: rng.randn(4, 1), b2: rng.randn(1)})
+    graph.fetch([cost, reference])
+    np.testing.assert_allclose(dense.value, reference.value)
+    gradcheck(graph, cost, [W1, b1, W2, b2, X])
+
+
+@pytest.mark.parametrize('layer', [Linear, Dense])
+def test_bias_of_shape_1_n(layer, gradcheck):
+    rng = np.random.RandomState(2)
+    X, y, W, b = inputs('X', 'y', 'W', 'b')
+    cost = MSE(y, layer(X, W, b))
+    graph = Graph({X: rng.randn(5, 3), y: rng.randn(5), W: rng.randn(3, 1), b: rng.randn(1, 1)})
+    gradcheck(graph, cost, [W, b])
+    assert b.gradients[b].shape == (1, 1)
+
+
+@pytest.mark.parametrize('layer', [Linear, Dense])
+def test_unused_layer_gets_zero_gradients(layer):
+    X, W, b = inputs('X', 'W', 'b')
+    layer(X, W, b)
+    Graph({X: np.ones((2, 3)), W: np.ones((3, 2)), b: np.ones(2)}).forward_and_backward()
+    for t in (W, b):
+        assert not np.any(t.gradients[t])
+
+
+def test_dense_with_integer_inputs():
+    X, W, b = inputs('X', 'W', 'b')
+    dense = Dense(X, W, b)
+    reference = Sigmoid(Linear(X, W, b))
+    graph = Graph({X: np.arange(6).reshape(2, 3), W: np.ones((3, 2), dtype=int),
+                   b: np.array([1, -20])})
+    value = graph.infer(dense)
+    assert value.dtype.kind == 'f'
+    np.testing.assert_allclose(value, graph.run(reference))
+    graph.forward_and_backward()
+
+
+@pytest.mark.parametrize('x_shape, w_shape, b_shape', [
+    ((2,), (2, 1), (1,)),
+    ((2,), (2,), ()),
+    ((3, 2), (2,), (1,)),
+    ((2,), (2, 3), (3,)),
+    ((2,), (2,), (3,)),
+])
+def test_linear_follows_np_dot(x_shape, w_shape, b_shape):
+    X, W, b = inputs('X', 'W', 'b')
+    layer = Linear(X, W, b)
+    feed = {X: np.arange(np.prod(x_shape), dtype=float).reshape(x_shape) + 1,
+            W: np.full(w_shape, 1.5), b: np.ones(b_shape)}
+    expected = forward_pass(layer, topological_sort(feed))
+    graph = Graph(feed)
+    np.testing.assert_allclose(graph.run(layer), expected)
+    np.testing.assert_allclose(graph.infer(layer), expected)
+
+
+def test_linear_rejects_mismatched_shapes():
+    X, W, b = inputs('X', 'W', 'b')
+    layer = Linear(X, W, b)
+    with pytest.raises(ValueError, match="can't multiply"):
+        Graph({X: np.ones(3), W: np.ones((2, 1)), b: np.ones(1)}).run(layer)
@@ -0,0 +1,89 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from miniflow import Input, SGD, Momentum, RMSProp, Adam, sgd_update
+
+
+def trainable(seed=0):
+    t = Input('t')
+    t.value = np.random.RandomState(seed).randn(3, 2)
+    return t
+
+
+def steps(t, count=5, seed=1):
+    rng = np.random.RandomState(seed)
+    for _ in range(count):
+        t.gradients[t] = rng.randn(*t.value.shape)
+        yield t.gradients[t]
+
+
+def test_sgd_matches_sgd_update():
+    t, reference = trainable(), trainable()
+    optimizer = SGD(0.1)
+    for grad in steps(t):
+        optimizer([t])
+        reference.gradients[reference] = grad
+        sgd_update([reference], 0.1)
+    np.testing.assert_allclose(t.value, reference.value)
+
+
+def test_momentum_matches_the_textbook_update():
+    t = trainable()
+    value, velocity = t.value.copy(), np.zeros_like(t.value)
+    optimizer = Momentum(0.1, momentum=0.9)
+    for grad in steps(t):
+        optimizer([t])
+        velocity = 0.9 * velocity - 0.1 * grad
+        value = value + velocity
+    np.testing.assert_allclose(t.value, value)
+
+
+def test_rmsprop_matches_the_textbook_update():
+    t = trainable()
+    value, s = t.value.copy(), np.zeros_like(t.value)
+    optimizer = RMSProp(0.01, decay=0.9, epsilon=1e-8)
+    for grad in steps(t):
+        optimizer([t])
+        s = 0.9 * s + 0.1 * grad ** 2
+        value = value - 0.01 * grad / (np.sqrt(s) + 1e-8)
+    np.testing.assert_allclose(t.value, value)
+
+
+def test_adam_matches_the_bias_corrected_update():
+    t = trainable()
+    value, m, v = t.value.copy(), np.zeros_like(t.value), np.zeros_like(t.value)
+    optimizer = Adam(0.01, beta1=0.9, beta2=0.999, epsilon=1e-8)
+    for step, grad in enumerate(steps(t), 1):
+        optimizer([t])
+        m = 0.9 * m + 0.1 * grad
+        v = 0.999 * v + 0.001 * grad ** 2
+        m_hat = m / (1 - 0.9 ** step)
+        v_hat = v / (1 - 0.999 ** step)
+        value = value - 0.01 * m_hat / (np.sqrt(v_hat) + 1e-8)
+    np.testing.assert_allclose(t.value, value)
+
+
+@pytest.mark.parametrize('optimizer', [SGD(0.1), Momentum(0.1), RMSProp(0.1), Adam(0.1)],
+                         ids=lambda o: type(o).__name__)
+def test_steps_after_the_first_do_not_allocate(optimizer):
+    t = Input('t')
+    t.value = np.ones((256, 256))
+    t.gradients[t] = np.ones((256, 256))
+    optimizer([t])
+    tracemalloc.start()
+    try:
+        optimizer([t])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < t.value.nbytes // 4
+
+
+def test_updates_mark_the_trainables_dirty():
+    t = trainable()
+    version = t.version
+    t.gradients[t] = np.ones_like(t.value)
+    Adam()([t])
+    assert t.version > version
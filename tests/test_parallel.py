@@ -0,0 +1,45 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from miniflow import Input, Linear, Sigmoid, MSE, Graph, DataParallelTrainer, sgd_update
+
+
+def build(seed=0):
+    rng = np.random.RandomState(seed)
+    X, y = Input('X'), Input('y')
+    W1, b1, W2, b2 = Input('W1'), Input('b1'), Input('W2'), Input('b2')
+    W1.value, b1.value = rng.randn(13, 10), np.zeros(10)
+    W2.value, b2.value = rng.randn(10, 1), np.zeros(1)
+    cost = MSE(y, Linear(Sigmoid(Linear(X, W1, b1)), W2, b2))
+    return X, y, [W1, b1, W2, b2], cost
+
+
+@pytest.mark.parametrize('method', [m for m in ('fork', 'spawn', 'forkserver')
+                                    if m in multiprocessing.get_all_start_methods()])
+def test_trainer_matches_single_process(method, monkeypatch):
+    monkeypatch.setattr(multiprocessing, 'Process', multiprocessing.get_context(method).Process)
+    monkeypatch.setattr(multiprocessing, 'Pipe', multiprocessing.get_context(method).Pipe)
+    rng = np.random.RandomState(1)
+    X_, y_ = rng.randn(600, 13), rng.randn(600)
+
+    X, y, trainables, cost = build()
+    X2, y2, reference, cost2 = build()
+    graph = Graph([X2, y2] + reference)
+    with DataParallelTrainer([X, y], cost, trainables, num_workers=3, learning_rate=0.01) as trainer:
+        # Even, uneven (fewer rows than workers) and growing batches.
+        for rows in [slice(0, 300), slice(0, 300), slice(0, 2), slice(None)]:
+            loss = trainer.step(X_[rows], y_[rows])
+            graph.forward_and_backward({X2: X_[rows], y2: y_[rows]})
+            sgd_update(reference, 0.01)
+            assert loss == pytest.approx(float(cost2.value))
+        for t, r in zip(trainables, reference):
+            np.testing.assert_allclose(t.value, r.value, atol=1e-12)
+
+
+def test_trainer_reports_worker_errors():
+    X, y, trainables, cost = build()
+    with DataParallelTrainer([X, y], cost, trainables, num_workers=2) as trainer:
+        with pytest.raises(RuntimeError, match='Worker failed'):
+            trainer.step(np.ones((4, 5)), np.ones(4))
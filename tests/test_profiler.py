@@ -0,0 +1,42 @@
+import numpy as np
+
+from miniflow import Input, Add, Linear, Sigmoid, Graph, Profiler, ThreadedExecutor, tracing
+
+
+def heads(count=4):
+    rng = np.random.RandomState(0)
+    X = Input('X')
+    feed = {X: rng.randn(64, 32)}
+    outputs = []
+    for _ in range(count):
+        W, b = Input('W'), Input('b')
+        feed[W], feed[b] = rng.randn(32, 32), rng.randn(32)
+        outputs.append(Sigmoid(Linear(X, W, b)))
+    Add(*outputs)
+    return feed
+
+
+def test_counts_every_call():
+    graph = Graph(heads())
+    with tracing(Profiler()) as profiler:
+        for _ in range(3):
+            graph.forward_and_backward()
+    profiler.close()
+    assert len(profiler.stats) == 2 * len(graph.sorted_nodes)
+    assert all(s['calls'] == 3 for s in profiler.stats.values())
+    linear = [s for s in profiler.stats.values() if s['node'].name == 'Linear_OP']
+    assert all(s['flops'] == 3 * 2 * 64 * 32 * 32 * (1 if s['kind'] == 'forward' else 2)
+               for s in linear)
+    assert any(s['bytes'] > 0 for s in profiler.stats.values())
+    assert 'Linear_OP' in profiler.report(limit=5)
+
+
+def test_concurrent_nodes_are_all_recorded():
+    with ThreadedExecutor(4) as executor:
+        graph = Graph(heads(8), executor=executor)
+        with tracing(Profiler()) as profiler:
+            for _ in range(5):
+                graph.forward_and_backward()
+        profiler.close()
+    assert sum(s['calls'] for s in profiler.stats.values()) == 5 * 2 * len(graph.sorted_nodes)
+    assert profiler._running == 0
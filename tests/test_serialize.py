@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from miniflow import (Input, Add, Mul, Linear, Sigmoid, MSE, Graph, DTypePolicy, CheckpointWriter,
+                      save_checkpoint, load_checkpoint, save_graph, load_graph)
+from miniflow import graph as graph_module
+
+
+def model(seed=0):
+    rng = np.random.RandomState(seed)
+    X, y, W, b = Input('X'), Input('y'), Input('W'), Input('b')
+    scale = Input('scale', constant=True)
+    W.value, b.value, scale.value = rng.randn(3, 2), rng.randn(2), np.array(0.5)
+    W2, b2 = Input('W2'), Input('b2')
+    W2.value, b2.value = rng.randn(2, 1), rng.randn(1)
+    out = Linear(Add(Mul(Sigmoid(Linear(X, W, b)), scale), Mul(scale, scale)), W2, b2)
+    return X, y, [W, b, W2, b2], out, MSE(y, out)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    _, _, trainables, _, _ = model(0)
+    _, _, others, _, _ = model(1)
+    save_checkpoint(str(tmp_path), trainables)
+    load_checkpoint(str(tmp_path), others)
+    for t, o in zip(trainables, others):
+        np.testing.assert_array_equal(t.value, o.value)
+        assert isinstance(o.value, np.memmap)
+
+
+def test_checkpoint_writer_snapshots(tmp_path):
+    _, _, trainables, _, _ = model(0)
+    expected = [np.array(t.value, copy=True) for t in trainables]
+    with CheckpointWriter() as writer:
+        writer.save(str(tmp_path), trainables)
+        for t in trainables:
+            t.value += 1.
+    for value, saved in zip(expected, load_checkpoint(str(tmp_path))):
+        np.testing.assert_array_equal(value, saved)
+
+
+def test_unset_values_are_rejected(tmp_path):
+    z = Input('z')
+    X = Input('X')
+    with pytest.raises(ValueError, match='no value'):
+        save_checkpoint(str(tmp_path / 'checkpoint'), [z])
+    with pytest.raises(ValueError, match='no value'):
+        save_graph(str(tmp_path / 'graph'), Add(z, X), [z])
+    with CheckpointWriter() as writer:
+        with pytest.raises(ValueError, match='no value'):
+            writer.save(str(tmp_path / 'writer'), [z])
+
+
+def test_saved_graph_gives_the_same_results(tmp_path):
+    rng = np.random.RandomState(2)
+    X, y, trainables, out, cost = model()
+    feed = {X: rng.randn(5, 3), y: rng.randn(5)}
+    graph = Graph([X, y] + trainables)
+    graph.forward_and_backward(feed)
+    expected_cost = float(cost.value)
+    expected_grads = [np.array(t.gradients[t], copy=True) for t in trainables]
+
+    save_graph(str(tmp_path), [cost, out], trainables)
+    loaded = load_graph(str(tmp_path))
+    inputs = {n.name: n for n in loaded.inputs}
+    assert sorted(inputs) == ['X', 'y']
+    cost2, out2 = loaded.outputs
+    loaded.graph.forward_and_backward({inputs['X']: feed[X], inputs['y']: feed[y]})
+    assert float(cost2.value) == pytest.approx(expected_cost)
+    for t, grad in zip(loaded.parameters, expected_grads):
+        np.testing.assert_allclose(t.gradients[t], grad)
+    np.testing.assert_allclose(loaded.graph.infer(out2, {inputs['X']: feed[X]}), graph.infer(out))
+
+
+def test_loaded_graph_does_not_sort_again(tmp_path, monkeypatch):
+    X, y, trainables, out, cost = model()
+    save_graph(str(tmp_path), [cost, out], trainables)
+    loaded = load_graph(str(tmp_path))
+    inputs = {n.name: n for n in loaded.inputs}
+
+    def fail(*args):
+        raise AssertionError("sorted again")
+
+    monkeypatch.setattr(graph_module, 'sort_ancestors', fail)
+    monkeypatch.setattr(graph_module, 'sort_nodes', fail)
+    feed = {inputs['X']: np.ones((2, 3)), inputs['y']: np.ones(2)}
+    loaded.graph.infer(loaded.outputs[1], feed)
+    loaded.graph.fetch(loaded.outputs)
+    loaded.graph.run(loaded.outputs[0])
+    loaded.graph.forward_and_backward()
+
+
+def test_loaded_graph_applies_the_dtype_policy(tmp_path):
+    X, y, trainables, out, _ = model()
+    save_graph(str(tmp_path), out, trainables)
+    loaded = load_graph(str(tmp_path), dtype_policy=DTypePolicy(np.float32))
+    assert all(t.value.dtype == np.float32 for t in loaded.parameters)
+    value = loaded.graph.infer(loaded.outputs[0], {loaded.inputs[0]: np.ones((2, 3))})
+    assert value.dtype == np.float32
@@ -0,0 +1,60 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from miniflow import Input, Linear, Sigmoid, Graph, InferenceServer, LocalClient
+
+
+def model():
+    rng = np.random.RandomState(0)
+    X, W, b = Input('X'), Input('W'), Input('b')
+    W.value, b.value = rng.randn(4, 3), rng.randn(3)
+    out = Sigmoid(Linear(X, W, b))
+    return Graph([X, W, b]), X, out
+
+
+def test_batched_answers_match_the_graph():
+    graph, X, out = model()
+    X_ = np.random.RandomState(1).randn(100, 4)
+    expected = np.array(graph.infer(out, {X: X_}), copy=True)
+
+    async def main():
+        async with InferenceServer(graph, X, out, max_batch_size=16) as server:
+            values = await LocalClient(server).map(X_, concurrency=40)
+            return values, server.stats()
+
+    values, stats = asyncio.run(main())
+    np.testing.assert_allclose(values, expected)
+    assert stats['requests'] == 100
+    assert stats['batches'] < 100
+
+
+def test_requests_fail_once_stopping_has_begun():
+    graph, X, out = model()
+
+    async def main():
+        server = InferenceServer(graph, X, out)
+        await server.start()
+        queued = asyncio.ensure_future(server.predict(np.ones(4)))
+        await asyncio.sleep(0)
+        stopping = asyncio.ensure_future(server.stop())
+        await asyncio.sleep(0)
+        with pytest.raises(ValueError):
+            await server.predict(np.ones(4))
+        await stopping
+        return await queued
+
+    assert asyncio.run(main()).shape == (3,)
+
+
+def test_bad_requests_fail_without_stopping_the_server():
+    graph, X, out = model()
+
+    async def main():
+        async with InferenceServer(graph, X, out) as server:
+            with pytest.raises(ValueError):
+                await server.predict(np.ones(5))
+            return await server.predict(np.ones(4))
+
+    assert asyncio.run(main()).shape == (3,)